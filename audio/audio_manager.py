@@ -1,22 +1,176 @@
 import pygame
 import os
+import queue
+import threading
+from collections import OrderedDict
+from audio.retro_filter import RetroFilterStream
+
+# Mixer channels reserved for each sound effect category
+CHANNEL_CATEGORIES = {
+    'ui': 2,
+    'player': 4,
+    'enemies': 8,
+    'ambience': 2,
+}
+
+# Instances of the same sound allowed at once unless configured otherwise
+DEFAULT_MAX_INSTANCES = 3
+
+# Crossfade used when play_music switches tracks
+DEFAULT_CROSSFADE_MS = 1000
+
+# Memory for decoded music tracks (about 10 MB per minute at 44.1 kHz stereo).
+# Tracks that are playing, fading or queued are kept even over the budget, so
+# a single track longer than the budget still plays, decoded in full
+DEFAULT_MUSIC_BUDGET_MB = 32
+
+
+class ChannelPool:
+    """
+    Mixer channels reserved per category with priority-based voice stealing.
+    
+    When every channel of a category is busy, the new sound takes the
+    channel of the lowest priority voice (the oldest one on ties), unless
+    that voice has a higher priority, in which case the trigger is dropped.
+    A sound already playing max_instances times restarts its oldest
+    instance instead of taking another channel.
+    """
+    
+    def __init__(self, categories=CHANNEL_CATEGORIES, first_channel=0):
+        total = first_channel + sum(categories.values())
+        pygame.mixer.set_num_channels(total)
+        # Reserve everything so Sound.play() never grabs one of our channels
+        pygame.mixer.set_reserved(total)
+        
+        self.channels = {}
+        self.voices = {}  # category -> (name, priority, serial) per channel
+        index = first_channel
+        for category, count in categories.items():
+            self.channels[category] = [pygame.mixer.Channel(i) for i in range(index, index + count)]
+            self.voices[category] = [None] * count
+            index += count
+        
+        self._serial = 0  # Increases with every voice, gives the age order
+        self.stats = {'triggers': 0, 'dropped': 0, 'stolen': 0, 'capped': 0}
+    
+    def play(self, sound, name, category, priority=0, max_instances=DEFAULT_MAX_INSTANCES):
+        """Play a sound on a channel of its category, returning the channel or None if dropped"""
+        self.stats['triggers'] += 1
+        channels = self.channels[category]
+        voices = self.voices[category]
+        
+        free = None
+        instances = []
+        for i, channel in enumerate(channels):
+            if not channel.get_busy():
+                voices[i] = None
+                if free is None:
+                    free = i
+            elif voices[i] and voices[i][0] == name:
+                instances.append(i)
+        
+        if max_instances and len(instances) >= max_instances:
+            # Restart the oldest instance instead of stacking another one
+            slot = min(instances, key=lambda i: voices[i][2])
+            self.stats['capped'] += 1
+        elif free is not None:
+            slot = free
+        else:
+            # Steal the lowest priority voice, oldest first
+            slot = min(range(len(channels)), key=lambda i: (voices[i] or ('', -1, 0))[1:])
+            if voices[slot] and voices[slot][1] > priority:
+                self.stats['dropped'] += 1
+                return None
+            self.stats['stolen'] += 1
+        
+        self._serial += 1
+        voices[slot] = (name, priority, self._serial)
+        channels[slot].play(sound)
+        return channels[slot]
+    
+    def active_voices(self, category=None):
+        """Number of channels currently playing, in one category or overall"""
+        categories = [category] if category else self.channels
+        return sum(channel.get_busy() for c in categories for channel in self.channels[c])
+    
+    def get_stats(self):
+        """Trigger counters plus the active voices of each category"""
+        stats = dict(self.stats)
+        stats['active'] = {category: self.active_voices(category) for category in self.channels}
+        return stats
+    
+    def stop(self):
+        """Stop every channel of the pool"""
+        for channels in self.channels.values():
+            for channel in channels:
+                channel.stop()
+
 
 class AudioManager:
-    def __init__(self):
+    def __init__(self, sound_budget_mb=64, music_budget_mb=DEFAULT_MUSIC_BUDGET_MB):
         # Initialize pygame mixer
         pygame.mixer.init()
         
+        # Channel 0 is kept for the real-time retro filter, 1 and 2 for the
+        # music (two so tracks can crossfade) and the rest are split between
+        # the sound effect categories
+        self.channel_pool = ChannelPool(CHANNEL_CATEGORIES, first_channel=3)
+        self.filter_channel = pygame.mixer.Channel(0)
+        self.filter_stream = None
+        self.filter_track = None  # Track played by filter_stream
+        self.pending_filter = None  # (name, intensity, loop) waiting for its track to load
+        
         # Music tracks
-        self.music_tracks = {}
+        self.music_tracks = {}  # name -> path
+        self.music_sounds = OrderedDict()  # name -> decoded Sound, least recently used first
+        self.music_sizes = {}  # name -> decoded size in bytes
+        self.music_budget_bytes = music_budget_mb * 1024 * 1024
+        self.music_cache_bytes = 0
+        self.state_music = {}  # game state -> (track name, crossfade ms)
+        
+        # Music playback: the current track plays on music_channels[music_channel],
+        # the other channel holds the track fading out during a crossfade
+        self.music_channels = [pygame.mixer.Channel(1), pygame.mixer.Channel(2)]
+        self.music_channel = None
+        self.music_channel_tracks = [None, None]
+        self.music_gains = [0.0, 0.0]
+        self.music_fades = {}  # channel index -> (start gain, end gain, start ms, duration ms)
+        self.pending_music = None  # (name, loop, fade_ms) waiting for its track to load
+        self.queued_music = None  # Track queued to follow the current one without a gap
+        
+        # Tracks are decoded by a worker thread, finished ones are picked up in update()
+        self._music_requests = queue.Queue()
+        self._music_ready = queue.Queue()
+        self._music_loading = set()
+        self._music_callbacks = {}  # name -> callbacks waiting for the track
+        self._music_thread = threading.Thread(target=self._music_worker, daemon=True)
+        self._music_thread.start()
         
-        # Sound effects
-        self.sound_effects = {}
+        # Sound effects cache, least recently used first
+        self.sound_effects = OrderedDict()
+        self.sound_files = {}  # name -> path, so evicted sounds can be reloaded
+        self.sound_sizes = {}  # name -> decoded size in bytes
+        self.sound_banks = {}  # game state -> names to preload
+        self.sound_settings = {}  # name -> (category, priority, max_instances)
+        self.sound_budget_bytes = sound_budget_mb * 1024 * 1024
+        self.sound_cache_bytes = 0
+        self.sound_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._sound_lock = threading.Lock()
+        
+        # Sound banks are decoded by their own worker thread, fed with lists of names
+        self._preload_requests = queue.Queue()
+        self._preload_thread = threading.Thread(target=self._preload_worker, daemon=True)
+        self._preload_thread.start()
         
         # Volume levels (0-100)
         self.main_volume = 100
         self.music_volume = 100
         self.fx_volume = 100
         
+        # Effective sound effect volume (main * fx), applied to every cached sound
+        # when it changes so playing a sound never has to set it
+        self.fx_effective_volume = 1.0
+        
         # Current playing music
         self.current_music = None
         
@@ -40,44 +194,362 @@ class AudioManager:
             print(f"Warning: Music file {filename} not found at {full_path}")
             return False
     
-    def load_sound(self, name, filename):
+    def load_sound(self, name, filename, category='ui', priority=0,
+                   max_instances=DEFAULT_MAX_INSTANCES):
         """Load a sound effect"""
+        if not self._register_sound(name, filename):
+            return False
+        self.configure_sound(name, category, priority, max_instances)
+        self._cache_sound(name)
+        return True
+    
+    def declare_sound_bank(self, state, sounds, category='ui', priority=0,
+                           max_instances=DEFAULT_MAX_INSTANCES):
+        """Declare the sound effects ({name: filename}) used in a game state"""
+        self.sound_banks[state] = [name for name, filename in sounds.items()
+                                   if self._register_sound(name, filename)]
+        for name in self.sound_banks[state]:
+            self.configure_sound(name, category, priority, max_instances)
+    
+    def configure_sound(self, name, category='ui', priority=0, max_instances=DEFAULT_MAX_INSTANCES):
+        """Set the channel category, priority and instance cap of a sound effect"""
+        if category not in CHANNEL_CATEGORIES:
+            raise ValueError(f"Unknown sound category: {category}")
+        self.sound_settings[name] = (category, priority, max_instances)
+    
+    def set_state_music(self, state, name, fade_ms=DEFAULT_CROSSFADE_MS):
+        """Play a music track (crossfading into it) whenever the game enters a state"""
+        self.state_music[state] = (name, fade_ms)
+        self.load_music_async(name)
+    
+    def set_game_state(self, state):
+        """Switch to the music of a game state and preload its sound bank in the background"""
+        if state in self.state_music:
+            name, fade_ms = self.state_music[state]
+            if name != self.current_music:
+                self.play_music(name, fade_ms=fade_ms)
+        
+        names = [name for name in self.sound_banks.get(state, [])
+                 if name not in self.sound_effects]
+        if names:
+            self._preload_requests.put(names)
+    
+    def _preload_worker(self):
+        # Never joined from the game loop, so switching states never waits for a bank
+        while True:
+            names = self._preload_requests.get()
+            if names is None:
+                return
+            for name in names:
+                if name not in self.sound_effects:
+                    self._cache_sound(name)
+    
+    def _register_sound(self, name, filename):
         full_path = os.path.join(self.fx_path, filename)
         if os.path.exists(full_path):
-            self.sound_effects[name] = pygame.mixer.Sound(full_path)
+            self.sound_files[name] = full_path
             return True
         else:
             print(f"Warning: Sound file {filename} not found")
             return False
     
-    def play_music(self, name, loop=-1):
-        """Play a music track"""
-        if name in self.music_tracks:
-            pygame.mixer.music.load(self.music_tracks[name])
-            pygame.mixer.music.play(loop)
+    def _cache_sound(self, name):
+        """Decode a registered sound into the cache, evicting old ones over budget"""
+        # Decode outside the lock so playback is never blocked by it
+        sound = pygame.mixer.Sound(self.sound_files[name])
+        sound_bytes = self._decoded_bytes(sound)
+        
+        with self._sound_lock:
+            # Under the lock, so a volume change is either seen here or applied to it
+            sound.set_volume(self.fx_effective_volume)
+            if name in self.sound_effects:
+                self.sound_cache_bytes -= self.sound_sizes[name]
+            self.sound_effects[name] = sound
+            self.sound_effects.move_to_end(name)
+            self.sound_sizes[name] = sound_bytes
+            self.sound_cache_bytes += sound_bytes
+            
+            # Evict least recently used sounds, but never the one just loaded
+            while self.sound_cache_bytes > self.sound_budget_bytes and len(self.sound_effects) > 1:
+                evicted, _ = self.sound_effects.popitem(last=False)
+                self.sound_cache_bytes -= self.sound_sizes.pop(evicted)
+                self.sound_cache_stats['evictions'] += 1
+        return sound
+    
+    def _decoded_bytes(self, sound):
+        """Memory used by a decoded Sound"""
+        frequency, size, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(size) // 8)
+    
+    def load_music_async(self, name, callback=None):
+        """
+        Decode a music track in the background.
+        
+        callback(name) is called from update() on the main thread once the
+        track is ready (right away if it already is).
+        """
+        if name not in self.music_tracks:
+            return False
+        if name in self.music_sounds:
+            if callback:
+                callback(name)
+            return True
+        if callback:
+            self._music_callbacks.setdefault(name, []).append(callback)
+        if name not in self._music_loading:
+            self._music_loading.add(name)
+            self._music_requests.put(name)
+        return True
+    
+    def _music_worker(self):
+        # pygame releases the GIL while decoding, so the game loop keeps running
+        while True:
+            name = self._music_requests.get()
+            if name is None:
+                return
+            try:
+                sound = pygame.mixer.Sound(self.music_tracks[name])
+            except pygame.error as e:
+                print(f"Warning: Could not load music {name}: {e}")
+                sound = None
+            self._music_ready.put((name, sound))
+    
+    def update(self):
+        """Per-frame work: finish background loads and advance music fades"""
+        while not self._music_ready.empty():
+            name, sound = self._music_ready.get()
+            self._music_loading.discard(name)
+            callbacks = self._music_callbacks.pop(name, [])
+            if sound is None:
+                continue
+            self.music_sounds[name] = sound
+            self.music_sizes[name] = self._decoded_bytes(sound)
+            self.music_cache_bytes += self.music_sizes[name]
+            for callback in callbacks:
+                callback(name)
+            # After the callbacks, so a track about to start is already in use
+            self._trim_music_sounds()
+        
+        if self.music_fades:
+            now = pygame.time.get_ticks()
+            for index, (start_gain, end_gain, start, duration) in list(self.music_fades.items()):
+                progress = min(1.0, (now - start) / duration)
+                self.music_gains[index] = start_gain + (end_gain - start_gain) * progress
+                if progress >= 1.0:
+                    del self.music_fades[index]
+                    if end_gain == 0:
+                        self.music_channels[index].stop()
+                        self.music_channel_tracks[index] = None
+                        self._trim_music_sounds()
+            self.update_music_volume()
+        
+        self._update_queued_music()
+    
+    def _trim_music_sounds(self):
+        """Forget the least recently used decoded tracks not in use until they fit the budget"""
+        for name in list(self.music_sounds):
+            if self.music_cache_bytes <= self.music_budget_bytes:
+                break
+            if (name not in self.music_channel_tracks and name != self.queued_music
+                    and name != self.filter_track):
+                del self.music_sounds[name]
+                self.music_cache_bytes -= self.music_sizes.pop(name)
+    
+    def play_music(self, name, loop=-1, fade_ms=DEFAULT_CROSSFADE_MS):
+        """
+        Play a music track, crossfading from the current one over fade_ms.
+        
+        The track is loaded in the background if needed; the current music
+        keeps playing until it is ready.
+        """
+        if name not in self.music_tracks:
+            return False
+        self._stop_filter_stream()
+        self.current_music = name
+        self.queued_music = None
+        self.pending_music = (name, loop, fade_ms)
+        self.load_music_async(name, self._start_pending_music)
+        return True
+    
+    def _start_pending_music(self, name):
+        # Only the last requested track starts, earlier requests are dropped
+        if self.pending_music and self.pending_music[0] == name:
+            _, loop, fade_ms = self.pending_music
+            self.pending_music = None
+            self._start_music(name, loop, fade_ms)
+    
+    def _start_music(self, name, loop, fade_ms):
+        sound = self.music_sounds[name]
+        self.music_sounds.move_to_end(name)
+        old = self.music_channel
+        if old is not None and self.music_channel_tracks[old] == name:
+            return
+        
+        new = 0 if old is None else 1 - old
+        channel = self.music_channels[new]
+        # Switching back to the track that is still fading out resumes it
+        if self.music_channel_tracks[new] != name or not channel.get_busy():
+            channel.play(sound, loops=loop)
+            self.music_channel_tracks[new] = name
+            self.music_gains[new] = 0.0
+        self.music_channel = new
+        
+        if fade_ms:
+            self._fade_music(new, 1.0, fade_ms)
+            if old is not None:
+                self._fade_music(old, 0.0, fade_ms)
+        else:
+            self.music_fades.pop(new, None)
+            self.music_gains[new] = 1.0
+            if old is not None:
+                self._stop_music_channel(old)
+        self.update_music_volume()
+    
+    def _fade_music(self, index, gain, fade_ms):
+        self.music_fades[index] = (self.music_gains[index], gain, pygame.time.get_ticks(), fade_ms)
+    
+    def _stop_music_channel(self, index):
+        self.music_channels[index].stop()
+        self.music_fades.pop(index, None)
+        self.music_gains[index] = 0.0
+        self.music_channel_tracks[index] = None
+    
+    def queue_music(self, name):
+        """
+        Play a track right after the current one ends, without a gap, and
+        loop it from then on. Useful to follow an intro (played with loop=0).
+        """
+        if name not in self.music_tracks:
+            return False
+        self.queued_music = name
+        self.load_music_async(name)
+        return True
+    
+    def _update_queued_music(self):
+        name = self.queued_music
+        if name is None or name not in self.music_sounds:
+            return
+        sound = self.music_sounds[name]
+        if self.music_channel is None or self.pending_music:
+            return
+        index = self.music_channel
+        channel = self.music_channels[index]
+        if not channel.get_busy():
+            # The previous track ended before this one was loaded
+            self._start_music(name, -1, 0)
+        elif channel.get_sound() is sound:
+            # Started playing: it is the current track now, keep it looping
+            self.music_channel_tracks[index] = name
             self.current_music = name
+            if channel.get_queue() is None:
+                channel.queue(sound)
+        elif channel.get_queue() is None:
+            channel.queue(sound)
+    
+    def play_music_filtered(self, name, intensity=0.5, loop=-1):
+        """
+        Play a music track through the real-time retro filter (8-bit effects applied live).
+        
+        Like play_music, the track is loaded in the background if needed.
+        """
+        if name not in self.music_tracks:
+            return False
+        self._stop_music_channels()
+        self._stop_filter_stream()
+        self.current_music = name
+        self.pending_filter = (name, intensity, loop)
+        self.load_music_async(name, self._start_pending_filter)
+        return True
+    
+    def _start_pending_filter(self, name):
+        # Only the last requested track starts, earlier requests are dropped
+        if self.pending_filter and self.pending_filter[0] == name:
+            _, intensity, loop = self.pending_filter
+            self.pending_filter = None
+            self.music_sounds.move_to_end(name)
+            self.filter_stream = RetroFilterStream(self.music_sounds[name], self.filter_channel,
+                                                   intensity, loop=loop != 0)
+            self.filter_stream.start()
+            self.filter_track = name
             self.update_music_volume()
-            return True
-        return False
     
-    def stop_music(self):
-        """Stop the currently playing music"""
-        pygame.mixer.music.stop()
+    def set_retro_intensity(self, intensity):
+        """Change the retro filter intensity (0-1) of the filtered music, e.g. with the danger level"""
+        if self.filter_stream:
+            self.filter_stream.set_intensity(intensity)
+        elif self.pending_filter:
+            name, _, loop = self.pending_filter
+            self.pending_filter = (name, intensity, loop)
+    
+    def _stop_filter_stream(self):
+        self.pending_filter = None
+        if self.filter_stream:
+            self.filter_stream.stop()
+            self.filter_stream = None
+            self.filter_track = None
+    
+    def _stop_music_channels(self):
+        self.pending_music = None
+        self.queued_music = None
+        for index in range(len(self.music_channels)):
+            self._stop_music_channel(index)
+        self.music_channel = None
+    
+    def stop_music(self, fade_ms=0):
+        """Stop the currently playing music, fading it out over fade_ms"""
+        if fade_ms and self.music_channel is not None:
+            self.pending_music = None
+            self.queued_music = None
+            for index, track in enumerate(self.music_channel_tracks):
+                if track is not None:
+                    self._fade_music(index, 0.0, fade_ms)
+            self.music_channel = None
+        else:
+            self._stop_music_channels()
+        self._stop_filter_stream()
         self.current_music = None
     
-    def play_sound(self, name):
-        """Play a sound effect"""
-        if name in self.sound_effects:
-            # Apply volume
-            self.sound_effects[name].set_volume(self.fx_volume / 100 * (self.main_volume / 100))
-            self.sound_effects[name].play()
-            return True
-        return False
+    def shutdown(self):
+        """Stop playback and background work (call before pygame.quit)"""
+        self.stop_music()
+        self._preload_requests.put(None)
+        self._music_requests.put(None)
+        self._preload_thread.join()
+        self._music_thread.join()
+        self.channel_pool.stop()
+    
+    def play_sound(self, name, priority=None):
+        """Play a sound effect, returning False if it is unknown or was dropped"""
+        with self._sound_lock:
+            sound = self.sound_effects.get(name)
+            if sound is not None:
+                self.sound_effects.move_to_end(name)
+                self.sound_cache_stats['hits'] += 1
+        
+        if sound is None:
+            if name not in self.sound_files:
+                return False
+            # Not preloaded (or evicted): load it now
+            with self._sound_lock:
+                self.sound_cache_stats['misses'] += 1
+            sound = self._cache_sound(name)
+        
+        # Volume is already set on the sound, see _apply_fx_volume
+        category, default_priority, max_instances = self.sound_settings.get(
+            name, ('ui', 0, DEFAULT_MAX_INSTANCES))
+        if priority is None:
+            priority = default_priority
+        return self.channel_pool.play(sound, name, category, priority, max_instances) is not None
+    
+    def get_voice_stats(self):
+        """Active voices per category and trigger counters (triggers, dropped, stolen, capped)"""
+        return self.channel_pool.get_stats()
     
     def update_main_volume(self, volume):
         """Update the main volume"""
         self.main_volume = max(0, min(100, volume))
         self.update_music_volume()
+        self._apply_fx_volume()
     
     def update_music_volume(self, volume=None):
         """Update the music volume"""
@@ -86,9 +558,18 @@ class AudioManager:
         
         # Calculate effective volume (main * music)
         effective_volume = (self.main_volume / 100) * (self.music_volume / 100)
-        pygame.mixer.music.set_volume(effective_volume)
+        for channel, gain in zip(self.music_channels, self.music_gains):
+            channel.set_volume(effective_volume * gain)
+        self.filter_channel.set_volume(effective_volume)
     
     def update_fx_volume(self, volume):
         """Update the sound effects volume"""
         self.fx_volume = max(0, min(100, volume))
-        # Sound effects volume is applied when playing
+        self._apply_fx_volume()
+    
+    def _apply_fx_volume(self):
+        """Set the effective sound effects volume on every cached sound"""
+        with self._sound_lock:
+            self.fx_effective_volume = (self.main_volume / 100) * (self.fx_volume / 100)
+            for sound in self.sound_effects.values():
+                sound.set_volume(self.fx_effective_volume)
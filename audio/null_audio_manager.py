@@ -0,0 +1,43 @@
+class NullAudioManager:
+    """
+    AudioManager stand-in that plays nothing and never touches the mixer.
+
+    Used by the headless runner, so the model can be driven on machines
+    without an audio device.
+    """
+
+    def __init__(self):
+        self.current_music = None
+        self.music_fades = {}
+        self.main_volume = 100
+        self.music_volume = 100
+        self.fx_volume = 100
+
+    def update(self):
+        pass
+
+    def set_game_state(self, state):
+        pass
+
+    def play_music(self, name, loop=-1, fade_ms=0):
+        self.current_music = name
+        return True
+
+    def stop_music(self, fade_ms=0):
+        self.current_music = None
+
+    def play_sound(self, name, priority=None):
+        return False
+
+    def update_main_volume(self, volume):
+        self.main_volume = max(0, min(100, volume))
+
+    def update_music_volume(self, volume=None):
+        if volume is not None:
+            self.music_volume = max(0, min(100, volume))
+
+    def update_fx_volume(self, volume):
+        self.fx_volume = max(0, min(100, volume))
+
+    def shutdown(self):
+        pass
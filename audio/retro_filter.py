@@ -0,0 +1,155 @@
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from music_processing.song_processing import (EffectChain, clip_stage, quantize_stage,
+                                              square_wave_stage)
+
+
+class RetroFilterStream:
+    """
+    Plays a track through the song_processing retro effects in real time.
+
+    The track is a Sound already decoded in the mixer format (AudioManager
+    loads it in the background), read in place as int16 samples. A
+    background thread renders it in short blocks (sample-and-hold rate reduction, bit crushing, pulse shaping)
+    and queues them on a mixer channel, so playback never waits on the main
+    loop. The effect intensity (0-1) can change at any time; the next block
+    crossfades from the old settings to the new ones, so there are no clicks.
+    """
+
+    # Frames per rendered block (about 23 ms at 44.1 kHz)
+    BLOCK_FRAMES = 1024
+
+    # Values reached at full intensity
+    MIN_SAMPLE_RATE = 6000  # Sample-and-hold rate
+    MIN_BIT_DEPTH = 6
+    MAX_PULSE = 0.6  # Square wave blend
+
+    def __init__(self, sound, channel, intensity=0.5, loop=True):
+        self.channel = channel
+        self.loop = loop
+        self.frequency, self.format, channels = pygame.mixer.get_init()
+
+        # A view of the Sound buffer, EffectChain converts each block to float32
+        samples = pygame.sndarray.samples(sound)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if samples.dtype.kind == 'f':
+            # Only float mixers need a copy
+            samples = (samples * 32767).astype(np.int16)
+        self.samples = samples
+        self.position = 0
+
+        self.intensity = self.current_intensity = max(0.0, min(1.0, intensity))
+        self.chain = self._build_chain(self.current_intensity)
+
+        # Render timing, to check the filter keeps up with playback
+        self.blocks_rendered = 0
+        self.render_seconds = 0.0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def finished(self):
+        return not self.loop and self.position >= len(self.samples)
+
+    @property
+    def load(self):
+        """Average render time as a fraction of the block duration (1.0 = no headroom)"""
+        if not self.blocks_rendered:
+            return 0.0
+        block_seconds = self.BLOCK_FRAMES / self.frequency
+        return self.render_seconds / self.blocks_rendered / block_seconds
+
+    def set_intensity(self, intensity):
+        """Set the effect intensity (0 = clean, 1 = full retro)"""
+        self.intensity = max(0.0, min(1.0, intensity))
+
+    def _build_chain(self, intensity):
+        """Return the EffectChain of song_processing stages for an intensity"""
+        stages = []
+        if intensity > 0:
+            bit_depth = 16 - intensity * (16 - self.MIN_BIT_DEPTH)
+            # Whole steps, the square wave stage needs whole sample values
+            stages.append(quantize_stage(int(2 ** (16 - bit_depth))))
+            stages.append(square_wave_stage(self.MAX_PULSE * intensity, 32767))
+        stages.append(clip_stage(32767))
+        return EffectChain(stages)
+
+    def _hold(self, frame_index, intensity):
+        """Sample-and-hold indices emulating a lower sample rate"""
+        rate = self.frequency - intensity * (self.frequency - self.MIN_SAMPLE_RATE)
+        step = self.frequency / rate
+        # Based on the absolute position, so holds line up across blocks
+        return (np.floor(frame_index / step) * step).astype(np.int64)
+
+    def _render(self, frame_index, intensity, chain):
+        frames = self.samples[self._hold(frame_index, intensity) % len(self.samples)]
+        return chain.process(frames.reshape(-1)).reshape(frames.shape)
+
+    def render_block(self):
+        """Render the next block as an int16 (frames, channels) array"""
+        start = time.perf_counter()
+
+        frames = self.BLOCK_FRAMES
+        if not self.loop:
+            frames = min(frames, len(self.samples) - self.position)
+        frame_index = np.arange(self.position, self.position + frames)
+        self.position += frames
+        if self.loop:
+            self.position %= len(self.samples)
+
+        intensity = self.intensity
+        if intensity == self.current_intensity:
+            block = self._render(frame_index, intensity, self.chain)
+        else:
+            # Crossfade from the old settings to the new ones over the block
+            old = self._render(frame_index, self.current_intensity, self.chain).astype(np.float32)
+            self.chain = self._build_chain(intensity)
+            new = self._render(frame_index, intensity, self.chain).astype(np.float32)
+            ramp = np.linspace(0, 1, frames, dtype=np.float32)[:, None]
+            block = (old + (new - old) * ramp).astype(np.int16)
+            self.current_intensity = intensity
+
+        self.render_seconds += time.perf_counter() - start
+        self.blocks_rendered += 1
+        return block
+
+    def _make_sound(self, block):
+        """Convert an int16 block to a Sound in the mixer format"""
+        if self.format == 32:
+            block = block.astype(np.float32) / 32768
+        if block.shape[1] == 1:
+            block = block[:, 0]
+        return pygame.sndarray.make_sound(np.ascontiguousarray(block))
+
+    def start(self):
+        """Start rendering and playing on the channel"""
+        self.stop()
+        self._stop.clear()
+        self.channel.play(self._make_sound(self.render_block()))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the render thread and the channel"""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.channel.stop()
+
+    def _run(self):
+        # Poll several times per block so the queue never runs dry
+        interval = self.BLOCK_FRAMES / self.frequency / 4
+        while not self._stop.is_set() and not self.finished:
+            if not self.channel.get_busy():
+                # Underrun (or first block): restart the channel
+                self.channel.play(self._make_sound(self.render_block()))
+            elif self.channel.get_queue() is None:
+                self.channel.queue(self._make_sound(self.render_block()))
+            self._stop.wait(interval)
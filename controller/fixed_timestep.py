@@ -0,0 +1,51 @@
+import time
+
+# Simulation steps per second, independent of the frame rate
+SIMULATION_HZ = 60
+
+# Most steps run in one frame. After a longer stall the extra time is
+# dropped instead of making the next frames even slower catching up
+MAX_CATCH_UP_STEPS = 5
+
+
+class FixedTimestep:
+    """
+    Accumulator that turns real elapsed time into fixed simulation steps.
+
+    advance() returns how many steps to run this frame; afterwards alpha is
+    the fraction of a step left over (0-1), used to interpolate rendering
+    between the previous and the current simulation state.
+    """
+
+    def __init__(self, hz=SIMULATION_HZ, max_steps=MAX_CATCH_UP_STEPS):
+        self.dt = 1.0 / hz
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.stats = {'steps': 0, 'capped_frames': 0, 'dropped_seconds': 0.0}
+        self._last = time.perf_counter()
+
+    def reset(self):
+        """Forget the elapsed time, e.g. while the simulation is paused"""
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self._last = time.perf_counter()
+
+    def advance(self, elapsed=None):
+        """Add the time since the last call (or elapsed seconds) and return the steps to run"""
+        now = time.perf_counter()
+        if elapsed is None:
+            elapsed = now - self._last
+        self._last = now
+
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.dt)
+        self.accumulator -= steps * self.dt
+        if steps > self.max_steps:
+            self.stats['capped_frames'] += 1
+            self.stats['dropped_seconds'] += (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+
+        self.stats['steps'] += steps
+        self.alpha = self.accumulator / self.dt
+        return steps
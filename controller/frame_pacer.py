@@ -0,0 +1,95 @@
+import time
+
+import pygame
+
+# Target frame rate of each game state
+DEFAULT_FPS = 60
+STATE_FPS = {
+    'MENU': 60,
+    'SETTINGS': 60,
+    'SAVE_MENU': 60,
+    'GAME': 60,
+}
+
+# States that only change on input, so they can sleep while nothing happens
+IDLE_STATES = ('MENU', 'SETTINGS', 'SAVE_MENU')
+
+# Time without input before an idle state stops rendering
+IDLE_DELAY_MS = 500
+
+# Longest sleep while idle, so background work (music loads) still gets picked up
+IDLE_TIMEOUT_MS = 250
+
+
+class FramePacer:
+    """
+    Decides how fast the main loop runs.
+
+    Gameplay (and anything marked busy, like a slider drag or a music
+    crossfade) runs at the target rate of its state. When a menu has had no
+    input for IDLE_DELAY_MS, get_events() blocks on pygame.event.wait until
+    something happens, and the loop skips frames that would have drawn the
+    same picture again.
+    """
+
+    def __init__(self, state_fps=None, idle_states=IDLE_STATES,
+                 idle_delay_ms=IDLE_DELAY_MS, idle_timeout_ms=IDLE_TIMEOUT_MS):
+        self.clock = pygame.time.Clock()
+        self.state_fps = dict(STATE_FPS)
+        if state_fps:
+            self.state_fps.update(state_fps)
+        self.idle_states = idle_states
+        self.idle_delay_ms = idle_delay_ms
+        self.idle_timeout_ms = idle_timeout_ms
+
+        self.idle = False
+        self._last_activity = pygame.time.get_ticks()
+        self._start = time.perf_counter()
+        self.stats = {'frames': 0, 'idle_seconds': 0.0, 'frames_saved': 0.0}
+
+    def set_state_fps(self, state, fps):
+        """Set the target frame rate of a game state"""
+        self.state_fps[state] = fps
+
+    def get_events(self, state, busy=False):
+        """
+        Return the pending events. In an idle state with nothing going on this
+        waits for the next event, returning [] if the timeout ran out first;
+        the caller should then skip the frame.
+        """
+        events = pygame.event.get()
+        now = pygame.time.get_ticks()
+        if events or busy or state not in self.idle_states:
+            self._last_activity = now
+            self.idle = False
+            return events
+        if now - self._last_activity < self.idle_delay_ms:
+            # Keep rendering for a moment, hover and selection changes settle
+            return events
+
+        self.idle = True
+        start = time.perf_counter()
+        event = pygame.event.wait(self.idle_timeout_ms)
+        waited = time.perf_counter() - start
+        self.stats['idle_seconds'] += waited
+        self.stats['frames_saved'] += waited * self.state_fps.get(state, DEFAULT_FPS)
+        if event.type == pygame.NOEVENT:
+            return []
+
+        self._last_activity = pygame.time.get_ticks()
+        self.idle = False
+        return [event] + pygame.event.get()
+
+    def tick(self, state):
+        """Wait for the end of the frame at the target rate of the state"""
+        self.stats['frames'] += 1
+        return self.clock.tick(self.state_fps.get(state, DEFAULT_FPS))
+
+    def report(self):
+        """Print how much time was spent idle instead of rendering"""
+        total = time.perf_counter() - self._start
+        idle = self.stats['idle_seconds']
+        share = idle / total if total else 0.0
+        print(f"Frame pacing: {idle:.1f} s idle of {total:.1f} s ({share:.0%}), "
+              f"{self.stats['frames']} frames rendered, "
+              f"{self.stats['frames_saved']:.0f} frames skipped")
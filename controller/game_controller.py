@@ -1,11 +1,17 @@
 import pygame
+from controller.input_source import LiveInput
+from controller.fixed_timestep import SIMULATION_HZ
 
 class GameController:
-    def __init__(self, model, view):
+    def __init__(self, model, view, input_source=None):
         self.model = model
         self.view = view
         
+        # Where polled input (held keys, mouse position) comes from
+        self.input = input_source or LiveInput()
+        
     def handle_event(self, event):
+        self.input.apply(event)
         if event.type == pygame.KEYDOWN:
             if self.model.game_state == "MENU":
                 self._handle_menu_input(event)
@@ -30,9 +36,22 @@ class GameController:
         # Update game state
         self.model.update()
         
+        # Update slider if dragging
+        if self.model.is_dragging_slider:
+            mouse_pos = self.input.get_mouse_pos()
+            slider_rects = self.view.get_slider_rects()
+            if self.model.dragged_slider_index >= 0 and self.model.dragged_slider_index < len(slider_rects):
+                self.model.update_slider_value(mouse_pos[0], slider_rects[self.model.dragged_slider_index])
+    
+    def step(self):
+        """Advance the simulation by one fixed timestep"""
+        self.model.save_previous_state()
+        if self.model.game_state == "GAME":
+            self.model.update_entities(1.0 / SIMULATION_HZ)
+        
         # Move the ball based on key states when in GAME state
         if self.model.game_state == "GAME":
-            keys = pygame.key.get_pressed()
+            keys = self.input.get_pressed()
             dx, dy = 0, 0
             
             if keys[pygame.K_LEFT]:
@@ -48,13 +67,6 @@ class GameController:
             if dx != 0 or dy != 0:
                 self.model.move_ball(dx, dy)
         
-        # Update slider if dragging
-        if self.model.is_dragging_slider:
-            mouse_pos = pygame.mouse.get_pos()
-            slider_rects = self.view.get_slider_rects()
-            if self.model.dragged_slider_index >= 0 and self.model.dragged_slider_index < len(slider_rects):
-                self.model.update_slider_value(mouse_pos[0], slider_rects[self.model.dragged_slider_index])
-        
     def _handle_menu_input(self, event):
         if event.key == pygame.K_UP:
             self.model.select_previous_menu_item()
@@ -0,0 +1,307 @@
+import struct
+import time
+
+import pygame
+
+# Input log format: header (magic, <H> version, <I> run seed), then one record per frame:
+#   frame    <IBH>  frame duration in microseconds, flags, event count
+#   keys     <B> count + <H> per pressed scancode   (if flags & KEYS_CHANGED)
+#   mouse    <hh>   position                        (if flags & MOUSE_CHANGED)
+#   events   <B> kind + payload (see EVENT_KINDS)
+# and an END_MARKER followed by the digest of the final model state
+LOG_MAGIC = b'ETIR'
+LOG_VERSION = 2  # Version 1 logs have no seed (runs used seed 0)
+END_MARKER = 0xFFFFFFFF
+KEYS_CHANGED = 1
+MOUSE_CHANGED = 2
+
+FRAME = struct.Struct('<IBH')
+KEY_EVENT = struct.Struct('<iHHB')  # key, mod, scancode, unicode length (+ utf-8 bytes)
+MOTION_EVENT = struct.Struct('<hhhhB')  # pos, rel, buttons bitmask
+BUTTON_EVENT = struct.Struct('<hhB')  # pos, button
+
+# Recorded event types (the controller only reacts to input events)
+EVENT_KINDS = {
+    pygame.KEYDOWN: 1,
+    pygame.KEYUP: 2,
+    pygame.MOUSEMOTION: 3,
+    pygame.MOUSEBUTTONDOWN: 4,
+    pygame.MOUSEBUTTONUP: 5,
+    pygame.QUIT: 6,
+}
+EVENT_TYPES = {kind: event_type for event_type, kind in EVENT_KINDS.items()}
+
+
+class LiveInput:
+    """Polled input straight from pygame (keyboard state and mouse position)"""
+
+    replaying = False
+
+    # Duration of the current frame for the fixed timestep, None = measure real time
+    frame_dt = None
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def get_mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+    def apply(self, event):
+        """Nothing to do, pygame already tracks its own state"""
+        pass
+
+    def begin_frame(self, events):
+        """Called once per frame with the events from pygame, returns the events to handle"""
+        return events
+
+    def close(self, digest=None):
+        pass
+
+
+class HeldKeys:
+    """Set of held keys indexable by key constant, like pygame.key.get_pressed()"""
+
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+class ScriptedInput:
+    """
+    Polled input driven by events instead of devices.
+
+    Every event passed to apply() updates the held keys and mouse position,
+    so the controller sees the same state it would with the real devices.
+    """
+
+    def __init__(self):
+        self.held = HeldKeys()
+        self.mouse_pos = (0, 0)
+
+    def get_pressed(self):
+        return self.held
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def apply(self, event):
+        if event.type == pygame.KEYDOWN:
+            self.held.keys.add(event.key)
+        elif event.type == pygame.KEYUP:
+            self.held.keys.discard(event.key)
+        elif event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            self.mouse_pos = event.pos
+
+
+class InputRecorder(LiveInput):
+    """
+    Live input that also writes every frame to a binary log: its duration,
+    its input events and the polled keyboard and mouse state.
+
+    The polled state is sampled once per frame in begin_frame() and the
+    controller reads that sample, so a replay sees exactly the same values.
+    The fixed timestep gets the recorded frame duration too, making the
+    number of simulation steps per frame reproducible.
+    """
+
+    def __init__(self, path, seed=0):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(LOG_MAGIC + struct.pack('<HI', LOG_VERSION, seed))
+        self.frames = 0
+        self.keys = pygame.key.get_pressed()
+        self.mouse_pos = pygame.mouse.get_pos()
+        self._recorded_keys = None
+        self._recorded_mouse = None
+        self._last = time.perf_counter()
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def begin_frame(self, events):
+        now = time.perf_counter()
+        dt_us = min(int((now - self._last) * 1000000), END_MARKER - 1)
+        self._last = now
+        # Use the rounded duration, the replay can only reproduce that one
+        self.frame_dt = dt_us / 1000000
+
+        self.keys = pygame.key.get_pressed()
+        self.mouse_pos = pygame.mouse.get_pos()
+        recorded = [event for event in events if event.type in EVENT_KINDS]
+
+        flags = 0
+        payload = []
+        if self.keys != self._recorded_keys:
+            flags |= KEYS_CHANGED
+            pressed = [scancode for scancode, down in enumerate(self.keys) if down]
+            payload.append(struct.pack(f'<B{len(pressed)}H', len(pressed), *pressed))
+            self._recorded_keys = self.keys
+        if self.mouse_pos != self._recorded_mouse:
+            flags |= MOUSE_CHANGED
+            payload.append(struct.pack('<hh', *self.mouse_pos))
+            self._recorded_mouse = self.mouse_pos
+        for event in recorded:
+            payload.append(_pack_event(event))
+
+        self.file.write(FRAME.pack(dt_us, flags, len(recorded)))
+        self.file.write(b''.join(payload))
+        self.frames += 1
+        return events
+
+    def close(self, digest=None):
+        """Finish the log, storing the final model state digest so replays can be checked"""
+        if self.file:
+            self.file.write(struct.pack('<I', END_MARKER) + (digest or '').encode().ljust(12))
+            self.file.close()
+            self.file = None
+            print(f"Input recorded: {self.frames} frames saved as {self.path}")
+
+
+class InputReplay:
+    """
+    Plays back a log written by InputRecorder through the controller.
+
+    begin_frame() returns the recorded events of the next frame (None once
+    the log is over) and sets the polled state and frame duration. With
+    realtime=True it waits so each frame starts at its recorded time,
+    otherwise frames run back to back as fast as possible.
+    """
+
+    replaying = True
+
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        self.frames, self.digest, self.seed = _read_log(path)
+        self.frame_index = 0
+        self.keys = pygame.key.ScancodeWrapper([0] * 512)
+        self.mouse_pos = (0, 0)
+        self.frame_dt = 0.0
+        self._clock_start = None
+        self._elapsed = 0.0
+
+    @property
+    def finished(self):
+        return self.frame_index >= len(self.frames)
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def apply(self, event):
+        pass
+
+    def begin_frame(self, events):
+        if self.finished:
+            return None
+        dt, keys, mouse_pos, recorded = self.frames[self.frame_index]
+        self.frame_index += 1
+        if keys is not None:
+            self.keys = keys
+        if mouse_pos is not None:
+            self.mouse_pos = mouse_pos
+        self.frame_dt = dt
+
+        self._elapsed += dt
+        if self.realtime:
+            if self._clock_start is None:
+                self._clock_start = time.perf_counter() - self._elapsed
+            delay = self._clock_start + self._elapsed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Live events are ignored, except closing the window
+        return recorded + [event for event in events if event.type == pygame.QUIT]
+
+    def close(self, digest=None):
+        if digest is None or not self.digest:
+            return
+        if self.finished and digest == self.digest:
+            print(f"Replay matches the recording (state {digest})")
+        else:
+            print(f"Replay diverged: state {digest}, recorded {self.digest}")
+
+
+def _pack_event(event):
+    kind = EVENT_KINDS[event.type]
+    if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+        text = getattr(event, 'unicode', '').encode()[:255]
+        return (struct.pack('<B', kind) +
+                KEY_EVENT.pack(event.key, event.mod, event.scancode, len(text)) + text)
+    if event.type == pygame.MOUSEMOTION:
+        buttons = sum(1 << i for i, down in enumerate(event.buttons) if down)
+        return struct.pack('<B', kind) + MOTION_EVENT.pack(*event.pos, *event.rel, buttons)
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return struct.pack('<B', kind) + BUTTON_EVENT.pack(*event.pos, event.button)
+    return struct.pack('<B', kind)
+
+
+def _read_log(path):
+    """Decode a log into a list of (dt, keys or None, mouse pos or None, events), the final digest and the run seed"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != LOG_MAGIC:
+        raise ValueError(f"{path} is not an input log")
+    version, = struct.unpack_from('<H', data, 4)
+    if version not in (1, LOG_VERSION):
+        raise ValueError(f"Unsupported input log version {version}")
+    seed = 0
+    offset = 6
+    if version >= 2:
+        seed, = struct.unpack_from('<I', data, offset)
+        offset += 4
+
+    frames = []
+    digest = None
+    while offset < len(data):
+        dt_us, = struct.unpack_from('<I', data, offset)
+        if dt_us == END_MARKER:
+            digest = data[offset + 4:offset + 16].decode().strip()
+            break
+        dt_us, flags, count = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+
+        keys = mouse_pos = None
+        if flags & KEYS_CHANGED:
+            n = data[offset]
+            pressed = struct.unpack_from(f'<{n}H', data, offset + 1)
+            offset += 1 + 2 * n
+            state = [0] * 512
+            for scancode in pressed:
+                state[scancode] = 1
+            keys = pygame.key.ScancodeWrapper(state)
+        if flags & MOUSE_CHANGED:
+            mouse_pos = struct.unpack_from('<hh', data, offset)
+            offset += 4
+
+        events = []
+        for _ in range(count):
+            event_type = EVENT_TYPES[data[offset]]
+            offset += 1
+            if event_type in (pygame.KEYDOWN, pygame.KEYUP):
+                key, mod, scancode, length = KEY_EVENT.unpack_from(data, offset)
+                offset += KEY_EVENT.size
+                text = data[offset:offset + length].decode(errors='replace')
+                offset += length
+                event = pygame.event.Event(event_type, key=key, mod=mod, scancode=scancode, unicode=text)
+            elif event_type == pygame.MOUSEMOTION:
+                x, y, rel_x, rel_y, buttons = MOTION_EVENT.unpack_from(data, offset)
+                offset += MOTION_EVENT.size
+                event = pygame.event.Event(event_type, pos=(x, y), rel=(rel_x, rel_y),
+                                           buttons=tuple(bool(buttons >> i & 1) for i in range(3)))
+            elif event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                x, y, button = BUTTON_EVENT.unpack_from(data, offset)
+                offset += BUTTON_EVENT.size
+                event = pygame.event.Event(event_type, pos=(x, y), button=button)
+            else:
+                event = pygame.event.Event(event_type)
+            events.append(event)
+        frames.append((dt_us / 1000000, keys, mouse_pos, events))
+    return frames, digest, seed
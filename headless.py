@@ -0,0 +1,187 @@
+"""
+Headless runner: drives the MVC stack without a window or an audio device.
+
+Scripted input is replayed tick by tick and the model is stepped as fast as
+possible, reporting ticks per second. Each tick handles that tick's events,
+runs GameController.update() and one fixed simulation step, and renders
+(offscreen with the dummy video driver, or only the layout with --null-view).
+
+Script format, one event per line ('#' starts a comment):
+  <tick> down <key>          Press and hold a key (pygame key name: up, down, return, escape...)
+  <tick> up <key>            Release a key
+  <tick> press <key>         Press a key and release it on the next tick
+  <tick> move <x> <y>        Move the mouse
+  <tick> click <x> <y>       Left click, released on the next tick
+
+Examples:
+  python headless.py                                  # Built-in script, 10000 ticks
+  python headless.py --ticks 100000 --null-view
+  python headless.py --script input.txt --once
+  python headless.py --min-tps 5000                   # Fail (exit 1) if slower, for CI
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Must be set before pygame initializes its video and audio subsystems
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from model.game_model import GameModel
+from model.level_generator import MAX_SEED
+from view.game_view import GameView
+from view.null_view import NullView
+from controller.game_controller import GameController
+from controller.input_source import ScriptedInput
+from audio.null_audio_manager import NullAudioManager
+
+# Goes through every menu, moves the ball around and comes back
+DEFAULT_SCRIPT = """
+# Settings: lower the music volume with the keyboard and click the FX slider
+0    press down
+5    press return
+10   press down
+15   press left
+20   press left
+25   move 520 420
+30   click 520 420
+35   move 480 420
+40   press escape
+# Start a game on slot 1 and move the ball
+50   press up
+55   press return
+60   press return
+70   down right
+130  down down
+160  up right
+220  up down
+230  down left
+300  up left
+310  press escape
+"""
+
+WINDOW_SIZE = (800, 600)
+
+
+def parse_script(lines):
+    """Return {tick: [events]} and the tick after the last event"""
+    script = {}
+    length = 0
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].split()
+        if not line:
+            continue
+        try:
+            tick, action, args = int(line[0]), line[1], line[2:]
+            events = _script_events(tick, action, args)
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"Invalid script line {number}: {' '.join(line)} ({e})")
+        for event_tick, event in events:
+            script.setdefault(event_tick, []).append(event)
+            length = max(length, event_tick + 1)
+    return script, length
+
+
+def _script_events(tick, action, args):
+    if action in ('down', 'up', 'press'):
+        key = pygame.key.key_code(args[0])
+        down = pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode='', scancode=0)
+        up = pygame.event.Event(pygame.KEYUP, key=key, mod=0, unicode='', scancode=0)
+        if action == 'down':
+            return [(tick, down)]
+        if action == 'up':
+            return [(tick, up)]
+        return [(tick, down), (tick + 1, up)]
+    pos = (int(args[0]), int(args[1]))
+    if action == 'move':
+        return [(tick, pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))]
+    if action == 'click':
+        return [(tick, pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)),
+                (tick + 1, pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))]
+    raise ValueError(f"unknown action {action}")
+
+
+def run(script, length, ticks, null_view=False, loop=True, seed=0):
+    """Step the game ticks times replaying the script, return the results"""
+    pygame.init()
+    screen = pygame.display.set_mode(WINDOW_SIZE)
+
+    model = GameModel(seed)
+    view = (NullView if null_view else GameView)(screen)
+    controller = GameController(model, view, ScriptedInput())
+    model.set_audio_manager(NullAudioManager())
+    # Start the floor worker before timing, like the game does at startup
+    model.level_prefetcher.start()
+
+    start = time.perf_counter()
+    tick = 0
+    while tick < ticks and model.running:
+        script_tick = tick % length if loop and length else tick
+        for event in script.get(script_tick, ()):
+            controller.handle_event(event)
+        controller.update()
+        controller.step()
+        view.render(model)
+        tick += 1
+    seconds = time.perf_counter() - start
+
+    results = {
+        'ticks': tick,
+        'seconds': seconds,
+        'ticks_per_second': tick / seconds if seconds else 0.0,
+        'view': 'null' if null_view else 'dummy',
+        'final_state': model.game_state,
+        'seed': seed,
+        'digest': model.state_digest(),
+    }
+    model.shutdown()
+    pygame.quit()
+    return results
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Ejecutar el juego sin ventana ni audio y medir ticks por segundo')
+    parser.add_argument('--ticks', type=int, default=10000,
+                        help='Número de ticks a simular (por defecto: 10000)')
+    parser.add_argument('--script', help='Archivo con la entrada a reproducir (por defecto: guion incluido)')
+    parser.add_argument('--once', action='store_true',
+                        help='No repetir el guion al terminar')
+    parser.add_argument('--null-view', action='store_true',
+                        help='No dibujar nada, solo calcular el diseño de pantalla')
+    parser.add_argument('--seed', type=int, default=0,
+                        help=f'Semilla de la partida para generar los pisos, de 0 a {MAX_SEED} (por defecto: 0)')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo JSON')
+    parser.add_argument('--min-tps', type=float,
+                        help='Fallar si los ticks por segundo quedan por debajo de este valor')
+    args = parser.parse_args()
+    if not 0 <= args.seed <= MAX_SEED:
+        parser.error(f"--seed must be between 0 and {MAX_SEED}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    pygame.init()
+    if args.script:
+        with open(args.script) as f:
+            script, length = parse_script(f)
+    else:
+        script, length = parse_script(DEFAULT_SCRIPT.splitlines())
+
+    results = run(script, length, args.ticks, args.null_view, loop=not args.once, seed=args.seed)
+    print(f"{results['ticks']} ticks in {results['seconds']:.3f} s -> "
+          f"{results['ticks_per_second']:.0f} ticks/s ({results['view']} view)")
+    print(f"Final state: {results['final_state']}, digest {results['digest']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved as: {args.json}")
+    if args.min_tps and results['ticks_per_second'] < args.min_tps:
+        print(f"Too slow: below {args.min_tps:.0f} ticks/s")
+        sys.exit(1)
@@ -1,13 +1,25 @@
+import argparse
 import pygame
 import sys
 import os
+import random
 from model.game_model import GameModel
+from model.level_generator import MAX_SEED
 from view.game_view import GameView
 from controller.game_controller import GameController
 from audio.audio_manager import AudioManager
+from controller.frame_pacer import FramePacer
+from controller.fixed_timestep import FixedTimestep
+from controller.input_source import LiveInput, InputRecorder, InputReplay
+from profiling.frame_profiler import (FrameProfiler, EVENTS, UPDATE, RENDER, OVERLAY,
+                                      WAIT, FLIP)
+
+# Set to 1 (or to a .csv/.json trace path) to profile without the command line flag
+PROFILE_ENV = 'ECONOMATO_PROFILE'
+DEFAULT_TRACE = 'frame_trace.csv'
 
 class Game:
-    def __init__(self):
+    def __init__(self, profiler=None, dirty_rects=False, record=None, replay=None, realtime=True, seed=None):
         pygame.init()
         self.WINDOW_SIZE = (800, 600)
         self.screen = pygame.display.set_mode(self.WINDOW_SIZE)
@@ -16,10 +28,25 @@ class Game:
         # Initialize audio manager
         self.audio_manager = AudioManager()
         
+        # Floors are generated from the run seed, random unless given (a replay uses the recorded one)
+        if seed is None:
+            seed = random.randrange(1 << 31)
+        
+        # Input comes from the devices, optionally recorded to a log, or from a replayed log
+        if replay:
+            self.input = InputReplay(replay, realtime)
+            seed = self.input.seed
+        elif record:
+            self.input = InputRecorder(record, seed)
+        else:
+            self.input = LiveInput()
+        
         # Initialize MVC components
-        self.model = GameModel()
-        self.view = GameView(self.screen)
-        self.controller = GameController(self.model, self.view)
+        self.model = GameModel(seed)
+        # Start the floor worker now, not when the first floor loads
+        self.model.level_prefetcher.start()
+        self.view = GameView(self.screen, dirty_rects)
+        self.controller = GameController(self.model, self.view, self.input)
         
         # Set audio manager in model
         self.model.set_audio_manager(self.audio_manager)
@@ -27,31 +54,137 @@ class Game:
         # Start playing menu music
         self.audio_manager.play_music('menu')
         
-        self.clock = pygame.time.Clock()
+        # Frame rate per state, sleeping while menus sit idle
+        self.pacer = FramePacer()
+        self.clock = self.pacer.clock
+        
+        # Gameplay advances in fixed steps, whatever the frame rate
+        self.timestep = FixedTimestep()
+        
+        # Frame profiler, None when profiling is off
+        self.profiler = profiler
 
     def run(self):
+        profiler = self.profiler
         while self.model.running:
-            # Handle events
-            for event in pygame.event.get():
+            # Handle events (an idle menu waits here for the next one)
+            state = self.model.game_state
+            busy = (self.input.replaying or self.model.is_dragging_slider or
+                    bool(self.audio_manager.music_fades))
+            events = self.pacer.get_events(state, busy)
+            if self.pacer.idle and not events:
+                # Nothing happened, the last frame is still on screen
+                self.audio_manager.update()
+                continue
+            
+            # The frame starts once the events are in, so idle waits are not profiled
+            if profiler:
+                profiler.start_frame()
+            
+            # Record the frame, or swap in the replayed one (None when the replay is over)
+            events = self.input.begin_frame(events)
+            if events is None:
+                break
+            
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.model.running = False
+                elif profiler and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.show_overlay = not profiler.show_overlay
                 self.controller.handle_event(event)
+            if profiler:
+                profiler.mark(EVENTS)
             
             # Update game state
             self.controller.update()
             
-            # Render
-            self.view.render(self.model)
+            # Run the simulation steps due since the last frame (only in game,
+            # elsewhere the elapsed time is dropped so entering the game starts clean)
+            if self.model.game_state == "GAME":
+                for _ in range(self.timestep.advance(self.input.frame_dt)):
+                    self.controller.step()
+            else:
+                self.timestep.reset()
+            
+            # Finish background music loads and advance crossfades
+            self.audio_manager.update()
+            if profiler:
+                profiler.mark(UPDATE)
             
-            # Cap the framerate
-            self.clock.tick(60)
+            # Render (in dirty rect mode only the changed areas are returned)
+            dirty = self.view.render(self.model, self.timestep.alpha)
+            if profiler:
+                profiler.mark(RENDER)
+                if profiler.show_overlay:
+                    overlay_rect = profiler.draw_overlay(self.screen)
+                    self.view.invalidate(overlay_rect)
+                    if dirty is not None:
+                        dirty.append(overlay_rect)
+                profiler.mark(OVERLAY)
+            
+            # Cap the framerate (target rate of the current state). Replays
+            # keep their recorded timing or run as fast as possible
+            if not self.input.replaying:
+                self.pacer.tick(self.model.game_state)
+            if profiler:
+                profiler.mark(WAIT)
             
             # Update display
-            pygame.display.flip()
-
+            if dirty is None:
+                pygame.display.flip()
+            elif dirty:
+                pygame.display.update(dirty)
+            if profiler:
+                profiler.mark(FLIP)
+                profiler.end_frame()
+        
+        if profiler:
+            profiler.dump()
+        self.pacer.report()
+        self.input.close(self.model.state_digest())
+        self.audio_manager.shutdown()
+        self.model.shutdown()
         pygame.quit()
         sys.exit()
 
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Economato-Textil')
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_TRACE, metavar='TRAZA',
+                        help=f'Medir cada fase del bucle principal y guardar la traza al salir '
+                             f'(.csv o .json, por defecto: {DEFAULT_TRACE}). F3 muestra las gráficas')
+    parser.add_argument('--profile-overlay', action='store_true',
+                        help='Mostrar las gráficas de tiempos de frame desde el inicio')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='Redibujar y actualizar solo las zonas de la pantalla que cambian')
+    input_group = parser.add_mutually_exclusive_group()
+    input_group.add_argument('--record', metavar='LOG',
+                             help='Grabar la entrada (eventos y estado de teclado y ratón) en este archivo')
+    input_group.add_argument('--replay', metavar='LOG',
+                             help='Reproducir una entrada grabada con --record')
+    parser.add_argument('--replay-speed', choices=['realtime', 'max'], default='realtime',
+                        help='Velocidad de la reproducción: tiempo real o lo más rápido posible '
+                             '(por defecto: realtime)')
+    parser.add_argument('--seed', type=int,
+                        help=f'Semilla de la partida para generar los pisos, de 0 a {MAX_SEED} '
+                             f'(por defecto: aleatoria)')
+    args = parser.parse_args()
+    if args.seed is not None and not 0 <= args.seed <= MAX_SEED:
+        parser.error(f"--seed must be between 0 and {MAX_SEED}")
+    return args
+
+def create_profiler(args):
+    """Return a FrameProfiler if profiling was asked for by flag or environment variable"""
+    trace = args.profile
+    env = os.environ.get(PROFILE_ENV, '')
+    if not trace and env and env != '0':
+        trace = env if env.endswith(('.csv', '.json')) else DEFAULT_TRACE
+    if not trace and not args.profile_overlay:
+        return None
+    return FrameProfiler(output=trace, show_overlay=args.profile_overlay)
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    args = parse_arguments()
+    game = Game(create_profiler(args), args.dirty_rects, args.record, args.replay,
+                args.replay_speed == 'realtime', args.seed)
+    game.run()
@@ -0,0 +1,142 @@
+"""
+Benchmarks for the spatial grid against brute force.
+
+Entities are spread at a constant density (the world grows with the count)
+and drift with random velocities. Results are checked against brute force
+before timing.
+
+Examples (from the repository root):
+  python -m model.benchmarks                                # 100, 1k and 10k entities
+  python -m model.benchmarks --counts 1000 50000 --ticks 200
+  python -m model.benchmarks --json spatial.json
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from model.entity_store import EntityStore
+from model.spatial_grid import DEFAULT_CELL_SIZE, SpatialGrid
+
+DEFAULT_COUNTS = (100, 1000, 10000)
+
+# Entities per 64x64 pixel area, about one enemy per cell
+DENSITY = 1.0
+
+# Brute force pairs are computed this many rows at a time to bound memory
+BRUTE_FORCE_CHUNK = 1024
+
+QUERIES = 100
+
+
+def populate(count, seed=0):
+    """Return an EntityStore with count drifting entities and the world side"""
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(count / DENSITY) * DEFAULT_CELL_SIZE
+    store = EntityStore()
+    for x, y, vx, vy in zip(rng.uniform(0, side, count), rng.uniform(0, side, count),
+                            rng.normal(0, 60, count), rng.normal(0, 60, count)):
+        store.create(x, y, vx=vx, vy=vy)
+    return store, side
+
+
+def brute_force_pairs(positions, radius):
+    """Set of row pairs (i < j) closer than radius, checking every pair"""
+    pairs = set()
+    for start in range(0, len(positions), BRUTE_FORCE_CHUNK):
+        block = positions[start:start + BRUTE_FORCE_CHUNK]
+        d2 = ((block[:, None, :] - positions[None, :, :]) ** 2).sum(axis=2)
+        i, j = np.nonzero(d2 <= radius * radius)
+        i += start
+        keep = i < j
+        pairs.update(zip(i[keep].tolist(), j[keep].tolist()))
+    return pairs
+
+
+def check(grid, store, radius, side, rng):
+    """Compare the grid answers with brute force, raising AssertionError on a mismatch"""
+    rows = {handle: row for row, handle in enumerate(store.handles.tolist())}
+    pairs = {tuple(sorted((rows[a], rows[b]))) for a, b in grid.candidate_pairs(radius).tolist()}
+    assert pairs == brute_force_pairs(store.positions, radius), "candidate pairs differ"
+
+    positions = store.positions
+    for x, y in rng.uniform(0, side, (10, 2)):
+        d2 = ((positions - np.array((x, y), dtype=np.float32)) ** 2).sum(axis=1)
+        expected = set(np.flatnonzero(d2 <= radius * radius).tolist())
+        assert {rows[h] for h in grid.query_radius(x, y, radius)} == expected, "radius query differs"
+        nearest = grid.nearest(x, y)
+        assert math.isclose(d2[rows[nearest]], d2.min(), rel_tol=1e-5), "nearest neighbour differs"
+
+
+def _ms(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(count, ticks, radius, brute_force=True):
+    """Time the grid operations for count entities, returning a dict of milliseconds"""
+    store, side = populate(count)
+    rng = np.random.default_rng(1)
+    grid = SpatialGrid(store)
+
+    start = time.perf_counter()
+    grid.update()
+    results = {'count': count, 'build_ms': (time.perf_counter() - start) * 1000}
+    check(grid, store, radius, side, rng)
+
+    def tick():
+        store.integrate(1 / 60)
+        grid.update()
+
+    moved = grid.stats['moved']
+    results['update_ms'] = _ms(tick, ticks)
+    results['moved_per_tick'] = (grid.stats['moved'] - moved) / ticks
+    results['pairs_ms'] = _ms(lambda: grid.candidate_pairs(radius), ticks)
+    results['pairs'] = len(grid.candidate_pairs(radius))
+
+    points = rng.uniform(0, side, (QUERIES, 2)).tolist()
+    results['radius_query_us'] = _ms(lambda: [grid.query_radius(x, y, radius) for x, y in points], 1) * 1000 / QUERIES
+    results['aabb_query_us'] = _ms(lambda: [grid.query_aabb(x - radius, y - radius, x + radius, y + radius)
+                                            for x, y in points], 1) * 1000 / QUERIES
+    results['nearest_query_us'] = _ms(lambda: [grid.nearest(x, y) for x, y in points], 1) * 1000 / QUERIES
+    if brute_force:
+        results['brute_force_ms'] = _ms(lambda: brute_force_pairs(store.positions, radius), 1)
+    return results
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Medir la rejilla espacial frente a la fuerza bruta')
+    parser.add_argument('--counts', type=int, nargs='+', default=list(DEFAULT_COUNTS),
+                        help='Número de entidades a probar (por defecto: 100 1000 10000)')
+    parser.add_argument('--ticks', type=int, default=100,
+                        help='Ticks por medición (por defecto: 100)')
+    parser.add_argument('--radius', type=float, default=32,
+                        help='Radio de colisión en píxeles, como mucho el tamaño de celda (por defecto: 32)')
+    parser.add_argument('--no-brute-force', action='store_true',
+                        help='No medir la comprobación de todos los pares')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo JSON')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    print(f"{'Entities':>9} {'Build':>9} {'Update':>9} {'Moved':>7} {'Pairs':>9} {'Found':>7} "
+          f"{'Radius':>9} {'AABB':>9} {'Nearest':>9} {'Brute':>10}")
+    all_results = []
+    for count in args.counts:
+        r = bench(count, args.ticks, args.radius, not args.no_brute_force)
+        all_results.append(r)
+        brute = f"{r['brute_force_ms']:8.2f}ms" if 'brute_force_ms' in r else f"{'-':>10}"
+        print(f"{count:>9} {r['build_ms']:7.2f}ms {r['update_ms']:7.3f}ms {r['moved_per_tick']:7.0f} "
+              f"{r['pairs_ms']:7.3f}ms {r['pairs']:>7} {r['radius_query_us']:7.1f}us "
+              f"{r['aabb_query_us']:7.1f}us {r['nearest_query_us']:7.1f}us {brute}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+        print(f"Results saved as: {args.json}")
@@ -0,0 +1,176 @@
+import numpy as np
+
+# A handle is (generation << SLOT_BITS) | slot. The generation of a slot grows
+# every time it is freed, so handles of destroyed entities never match again
+SLOT_BITS = 20
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+DEFAULT_CAPACITY = 64
+
+
+class EntityStore:
+    """
+    Entities stored as NumPy columns (struct of arrays) instead of objects.
+
+    Live entities are packed in rows [0, count) of every column, so per-tick
+    updates run over whole columns at once (see integrate and remove_where).
+    Each entity also has a stable integer handle: removing an entity moves
+    the last row into its place (O(1) swap-remove) and its slot goes to a
+    free list for reuse.
+
+    The column properties (positions, velocities, hp, kinds...) are views of
+    the live rows, valid until the next create (which may reallocate).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.count = 0
+        self.version = 0  # Bumped whenever rows are added, removed or reordered
+        self._position = np.zeros((capacity, 2), dtype=np.float32)
+        self._prev_position = np.zeros((capacity, 2), dtype=np.float32)
+        self._velocity = np.zeros((capacity, 2), dtype=np.float32)  # Pixels per second
+        self._hp = np.zeros(capacity, dtype=np.int32)
+        self._kind = np.zeros(capacity, dtype=np.int16)
+        self._slot = np.zeros(capacity, dtype=np.int32)  # Row -> slot
+
+        # Slot -> row (-1 when free) and current generation
+        self.slot_row = np.full(capacity, -1, dtype=np.int32)
+        self.slot_generation = np.zeros(capacity, dtype=np.int64)
+        self.free_slots = []
+        self.next_slot = 0
+
+    @property
+    def _columns(self):
+        return (self._position, self._prev_position, self._velocity, self._hp, self._kind, self._slot)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Iterate over the handles of the live entities"""
+        return iter(self.handles.tolist())
+
+    @property
+    def positions(self):
+        return self._position[:self.count]
+
+    @property
+    def prev_positions(self):
+        return self._prev_position[:self.count]
+
+    @property
+    def velocities(self):
+        return self._velocity[:self.count]
+
+    @property
+    def hp(self):
+        return self._hp[:self.count]
+
+    @property
+    def kinds(self):
+        return self._kind[:self.count]
+
+    @property
+    def handles(self):
+        """Handles of the live entities, in row order"""
+        slots = self._slot[:self.count]
+        return (self.slot_generation[slots] << SLOT_BITS) | slots
+
+    def _grow(self):
+        capacity = len(self._hp) * 2
+        self._position, self._prev_position, self._velocity, self._hp, self._kind, self._slot = (
+            _resized(column, capacity) for column in self._columns)
+        self.slot_row = np.concatenate((self.slot_row, np.full(capacity - len(self.slot_row), -1, np.int32)))
+        self.slot_generation = _resized(self.slot_generation, capacity)
+
+    def create(self, x, y, kind=0, hp=1, vx=0.0, vy=0.0):
+        """Add an entity and return its handle"""
+        if self.count == len(self._hp):
+            self._grow()
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            # Slots in use never outnumber the rows, so this one fits
+            slot = self.next_slot
+            self.next_slot += 1
+
+        row = self.count
+        self.count += 1
+        self.version += 1
+        self._position[row] = (x, y)
+        self._prev_position[row] = (x, y)
+        self._velocity[row] = (vx, vy)
+        self._hp[row] = hp
+        self._kind[row] = kind
+        self._slot[row] = slot
+        self.slot_row[slot] = row
+        return int(self.slot_generation[slot]) << SLOT_BITS | slot
+
+    def row(self, handle):
+        """Row of an entity in the columns, or -1 if the handle is not alive"""
+        slot = handle & SLOT_MASK
+        if slot >= self.next_slot or self.slot_generation[slot] != handle >> SLOT_BITS:
+            return -1
+        return int(self.slot_row[slot])
+
+    def alive(self, handle):
+        return self.row(handle) >= 0
+
+    def destroy(self, handle):
+        """Remove an entity in O(1) by moving the last row into its place"""
+        row = self.row(handle)
+        if row < 0:
+            return False
+        last = self.count - 1
+        if row != last:
+            for column in self._columns:
+                column[row] = column[last]
+            self.slot_row[self._slot[row]] = row
+        self._free(handle & SLOT_MASK)
+        self.count = last
+        self.version += 1
+        return True
+
+    def _free(self, slot):
+        self.slot_row[slot] = -1
+        self.slot_generation[slot] += 1
+        self.free_slots.append(slot)
+
+    def remove_where(self, mask):
+        """Remove every live entity where mask (one bool per row) is set, returning how many"""
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return 0
+        removed = int(mask.sum())
+        n = self.count
+        removed_slots = self._slot[:n][mask]
+        keep = ~mask
+        kept = n - removed
+        for column in self._columns:
+            column[:kept] = column[:n][keep]
+        self.slot_row[self._slot[:kept]] = np.arange(kept, dtype=np.int32)
+        self.slot_row[removed_slots] = -1
+        self.slot_generation[removed_slots] += 1
+        self.free_slots.extend(removed_slots.tolist())
+        self.count = kept
+        self.version += 1
+        return removed
+
+    def save_positions(self):
+        """Copy the positions to prev_positions, before a simulation step"""
+        if self.count:
+            np.copyto(self.prev_positions, self.positions)
+
+    def integrate(self, dt):
+        """Move every entity by its velocity over dt seconds"""
+        positions = self.positions
+        positions += self.velocities * np.float32(dt)
+
+    def clear(self):
+        """Remove every entity (handles given out so far become invalid)"""
+        self.remove_where(np.ones(self.count, dtype=bool))
+
+
+def _resized(column, capacity):
+    grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
@@ -1,10 +1,21 @@
+import hashlib
+from model.entity_store import EntityStore
+from model.spatial_grid import SpatialGrid
+from model.level_generator import LevelGenerator, STAIRS, WALL
+from model.level_prefetcher import LevelPrefetcher
+
 class GameModel:
-    def __init__(self):
+    def __init__(self, seed=0):
         # Game state
         self.player = None
         self.current_level = None
-        self.enemies = []
-        self.items = []
+        self.run_seed = seed  # Floors are generated from the run seed and the floor number
+        self.floor = 1
+        self.level_generator = LevelGenerator()
+        self.level_prefetcher = LevelPrefetcher(self.level_generator)  # Next floor, in a worker process
+        self.enemies = EntityStore()  # Columns of position, velocity, HP and type
+        self.items = EntityStore()
+        self.enemy_grid = SpatialGrid(self.enemies)  # Proximity and collision queries
         self.space_pressed = False  # Add space key state
         self.game_state = "MENU"  # States: MENU, GAME, SETTINGS, EXIT, SAVE_MENU
         self.selected_menu_item = 0
@@ -15,7 +26,12 @@ class GameModel:
         self.ball_x = 400  # Starting x position (center of screen)
         self.ball_y = 300  # Starting y position (center of screen)
         self.ball_radius = 20
-        self.ball_speed = 5
+        self.ball_speed = 5  # Pixels per simulation step (60 steps per second)
+        
+        # Ball position before the last simulation step, rendering
+        # interpolates between it and the current one
+        self.prev_ball_x = self.ball_x
+        self.prev_ball_y = self.ball_y
         
         # Settings state
         self.settings_selected_item = 0
@@ -39,6 +55,7 @@ class GameModel:
         
         # Audio manager reference (will be set from main.py)
         self.audio_manager = None
+        self.audio_state = None  # Last game state reported to the audio manager
         
     def set_audio_manager(self, audio_manager):
         """Set the audio manager reference and sync volume settings"""
@@ -50,28 +67,68 @@ class GameModel:
         self.audio_manager.update_fx_volume(self.fx_volume)
         
     def update(self):
+        # Let the audio manager preload the sound bank of a new state
+        if self.audio_manager and self.game_state != self.audio_state:
+            self.audio_state = self.game_state
+            self.audio_manager.set_game_state(self.game_state)
+        
+        # Pick up the next floor once the worker has it, or drop it when the run
+        # is over (back to the menu, or any other state after dying)
+        if self.level_prefetcher.pending:
+            if self.game_state == "GAME":
+                self.level_prefetcher.poll()
+            else:
+                self.level_prefetcher.cancel()
+        
         # Update game state
         if self.game_state == "GAME":
             # Any game state updates would go here
             pass
         
     def initialize_level(self):
-        # Initialize level layout and entities
-        pass
+        """Load the layout of the current floor and spawn its enemies and items"""
+        self.level_prefetcher.wait(self.run_seed, self.floor)
+        # The cached level stays pristine, this run's tile changes go to a copy
+        level = self.level_generator.generate(self.run_seed, self.floor).copy()
+        self.current_level = level
+        
+        self.enemies.clear()
+        self.items.clear()
+        for x, y, kind in level.enemy_spawns.tolist():
+            self.add_enemy(*level.tile_center((x, y)), kind=kind, hp=1 + kind)
+        for x, y, kind in level.item_spawns.tolist():
+            self.add_item(*level.tile_center((x, y)), kind=kind)
+        self.enemy_grid.update()
+        
+        # The ball starts on the start tile, without interpolating from the last floor
+        self.ball_x, self.ball_y = level.tile_center(level.start)
+        self.prev_ball_x, self.prev_ball_y = self.ball_x, self.ball_y
+        
+        # Have the floor below ready by the time the player finds the stairs
+        self.level_prefetcher.prefetch(self.run_seed, self.floor + 1)
+        
+    def next_floor(self):
+        """Go down the stairs to the next floor"""
+        self.floor += 1
+        self.initialize_level()
+        
+    def shutdown(self):
+        """Stop the level worker process"""
+        self.level_prefetcher.shutdown()
         
-    def add_enemy(self, enemy):
-        self.enemies.append(enemy)
+    def add_enemy(self, x, y, kind=0, hp=1, vx=0.0, vy=0.0):
+        """Add an enemy and return its handle"""
+        return self.enemies.create(x, y, kind, hp, vx, vy)
         
-    def remove_enemy(self, enemy):
-        if enemy in self.enemies:
-            self.enemies.remove(enemy)
+    def remove_enemy(self, handle):
+        return self.enemies.destroy(handle)
             
-    def add_item(self, item):
-        self.items.append(item)
+    def add_item(self, x, y, kind=0):
+        """Add an item and return its handle"""
+        return self.items.create(x, y, kind)
         
-    def remove_item(self, item):
-        if item in self.items:
-            self.items.remove(item)
+    def remove_item(self, handle):
+        return self.items.destroy(handle)
             
     def select_menu_item(self):
         """Handle menu item selection"""
@@ -106,15 +163,57 @@ class GameModel:
             if self.audio_manager:
                 self.audio_manager.update_fx_volume(self.fx_volume)
                 
+    def state_digest(self):
+        """Short hash of the simulation state, equal across runs given the same input"""
+        state = (self.game_state, self.run_seed, self.floor, self.ball_x, self.ball_y, self.main_volume,
+                 self.music_volume, self.fx_volume, self.selected_menu_item,
+                 self.settings_selected_item, self.save_menu_selected_item,
+                 self.enemies.positions.tobytes(), self.enemies.hp.tobytes(),
+                 self.items.positions.tobytes())
+        return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+    
+    def save_previous_state(self):
+        """Remember the current positions before a simulation step, for interpolation"""
+        self.prev_ball_x = self.ball_x
+        self.prev_ball_y = self.ball_y
+        self.enemies.save_positions()
+    
+    def update_entities(self, dt):
+        """Advance every enemy by dt seconds at once and drop the dead ones"""
+        if self.enemies.count:
+            self.enemies.integrate(dt)
+            self.enemies.remove_where(self.enemies.hp <= 0)
+        if self.enemies.count or self.enemy_grid.handle_cell:
+            self.enemy_grid.update()
+    
+    def enemies_near(self, x, y, radius):
+        """Handles of the enemies within radius of (x, y), as of the last simulation step"""
+        return self.enemy_grid.query_radius(x, y, radius)
+    
+    def enemy_collisions(self, radius):
+        """(N, 2) array of enemy handle pairs closer than radius (at most the grid cell size)"""
+        return self.enemy_grid.candidate_pairs(radius)
+    
     def move_ball(self, dx, dy):
-        """Move the ball by the given delta x and y, keeping it within screen bounds"""
-        # Update ball position
-        self.ball_x += dx * self.ball_speed
-        self.ball_y += dy * self.ball_speed
+        """Move the ball by the given delta x and y, through the level's floor (or within the screen without a level)"""
+        new_x = self.ball_x + dx * self.ball_speed
+        new_y = self.ball_y + dy * self.ball_speed
+        
+        level = self.current_level
+        if level is None:
+            # Keep ball within screen bounds (800x600)
+            self.ball_x = max(self.ball_radius, min(800 - self.ball_radius, new_x))
+            self.ball_y = max(self.ball_radius, min(600 - self.ball_radius, new_y))
+            return
+        
+        # Walls stop the ball's center, one axis at a time so it slides along them
+        if level.tile_at(new_x, self.ball_y) != WALL:
+            self.ball_x = new_x
+        if level.tile_at(self.ball_x, new_y) != WALL:
+            self.ball_y = new_y
         
-        # Keep ball within screen bounds (800x600)
-        self.ball_x = max(self.ball_radius, min(800 - self.ball_radius, self.ball_x))
-        self.ball_y = max(self.ball_radius, min(600 - self.ball_radius, self.ball_y))
+        if level.tile_at(self.ball_x, self.ball_y) == STAIRS:
+            self.next_floor()
         
     def select_next_menu_item(self):
         self.selected_menu_item = (self.selected_menu_item + 1) % len(self.menu_items)
@@ -180,9 +279,8 @@ class GameModel:
         if self.save_menu_selected_item < 3:  # Selected a save slot
             # Enter the game with the selected slot
             self.game_state = "GAME"
-            # Reset ball position to center
-            self.ball_x = 400
-            self.ball_y = 300
+            self.floor = 1
+            self.initialize_level()  # Also puts the ball on the start tile
         else:  # Selected Back
             self.game_state = "MENU"
             
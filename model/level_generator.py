@@ -0,0 +1,316 @@
+import struct
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Tile codes of Level.tiles
+WALL = 0
+FLOOR = 1
+STAIRS = 2
+
+# Run seeds are 32-bit (input logs store them as <I)
+MAX_SEED = 2**32 - 1
+
+TILE_SIZE = 32  # Pixels per tile
+LEVEL_WIDTH = 64  # Tiles
+LEVEL_HEIGHT = 48
+
+# Rooms: random candidates, kept when they do not overlap the ones kept before
+ROOM_CANDIDATES = 64
+MIN_ROOM_SIZE = 4
+MAX_ROOM_SIZE = 11
+BASE_ROOMS = 6  # Room count on floor 1, one more per floor
+MAX_ROOMS = 16
+
+# Chance of an extra corridor between close rooms, so the castle has loops
+LOOP_CHANCE = 0.2
+
+# A layout with unreachable rooms is thrown away and tried again
+MAX_ATTEMPTS = 4
+
+# Generating a floor should take no more than this (it only warns: cutting the
+# work short would make the layout depend on the machine)
+GENERATION_BUDGET_MS = 5.0
+
+# Generated floors kept for revisits and reloads
+CACHE_SIZE = 16
+
+# Level buffer: header, then the int32 arrays (rooms, edges, enemy and item
+# spawns) and the uint8 tiles, so every array starts 4-byte aligned
+BUFFER_MAGIC = b'ETLV'
+BUFFER_HEADER = struct.Struct('<4sqiHHHHHHhhhhf')  # seed, floor, size, counts, start, stairs, ms
+
+
+class Level:
+    """
+    A generated castle floor.
+
+    tiles is a (height, width) uint8 grid of tile codes, rooms an (N, 4)
+    array of x, y, width, height in tiles and edges the (E, 2) room pairs
+    joined by corridors. start and stairs are (x, y) tiles, enemy_spawns
+    and item_spawns (K, 3) arrays of x, y, kind. Levels from the cache are
+    shared, so their arrays are read-only and they are never changed: a run
+    plays a copy(), whose set_tile() copies the tile grid before the first
+    change and logs every change in changes, for the view.
+    """
+
+    def __init__(self, seed, floor, tiles, rooms, edges, start, stairs, enemy_spawns, item_spawns):
+        self.seed = seed
+        self.floor = floor
+        self.tiles = tiles
+        self.rooms = rooms
+        self.edges = edges
+        self.start = start
+        self.stairs = stairs
+        self.enemy_spawns = enemy_spawns
+        self.item_spawns = item_spawns
+        self.generation_ms = 0.0
+        self.changes = []  # (x, y) of every tile changed by set_tile
+
+    @property
+    def width(self):
+        return self.tiles.shape[1]
+
+    @property
+    def height(self):
+        return self.tiles.shape[0]
+
+    @property
+    def pixel_size(self):
+        return self.width * TILE_SIZE, self.height * TILE_SIZE
+
+    def tile_at(self, x, y):
+        """Tile code under the pixel position (x, y), WALL outside the level"""
+        tx, ty = int(x // TILE_SIZE), int(y // TILE_SIZE)
+        if 0 <= tx < self.width and 0 <= ty < self.height:
+            return int(self.tiles[ty, tx])
+        return WALL
+
+    def copy(self):
+        """A level to play: shares the arrays, but set_tile() on it leaves this one untouched"""
+        tiles = self.tiles.copy() if self.tiles.flags.writeable else self.tiles
+        level = Level(self.seed, self.floor, tiles, self.rooms, self.edges, self.start, self.stairs,
+                      self.enemy_spawns, self.item_spawns)
+        level.generation_ms = self.generation_ms
+        return level
+
+    def set_tile(self, x, y, code):
+        """Change a tile (e.g. a door opening)"""
+        if not self.tiles.flags.writeable:
+            self.tiles = self.tiles.copy()
+        self.tiles[y, x] = code
+        self.changes.append((x, y))
+
+    def tile_center(self, tile):
+        """Pixel position of the center of a tile"""
+        return (tile[0] + 0.5) * TILE_SIZE, (tile[1] + 0.5) * TILE_SIZE
+
+    def to_buffer(self):
+        """Pack the level into one compact bytes object (see BUFFER_HEADER)"""
+        header = BUFFER_HEADER.pack(BUFFER_MAGIC, self.seed, self.floor, self.width, self.height,
+                                    len(self.rooms), len(self.edges), len(self.enemy_spawns),
+                                    len(self.item_spawns), *self.start, *self.stairs, self.generation_ms)
+        return b''.join((header, self.rooms.tobytes(), self.edges.tobytes(), self.enemy_spawns.tobytes(),
+                         self.item_spawns.tobytes(), self.tiles.tobytes()))
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Level whose arrays are read-only views into a buffer from to_buffer(), nothing is copied"""
+        (magic, seed, floor, width, height, rooms, edges, enemies, items,
+         start_x, start_y, stairs_x, stairs_y, generation_ms) = BUFFER_HEADER.unpack_from(buffer)
+        if magic != BUFFER_MAGIC:
+            raise ValueError("Not a level buffer")
+
+        offset = BUFFER_HEADER.size
+        arrays = []
+        for dtype, shape in ((np.int32, (rooms, 4)), (np.int32, (edges, 2)), (np.int32, (enemies, 3)),
+                             (np.int32, (items, 3)), (np.uint8, (height, width))):
+            count = shape[0] * shape[1]
+            arrays.append(np.frombuffer(buffer, dtype, count, offset).reshape(shape))
+            offset += count * np.dtype(dtype).itemsize
+        rooms, edges, enemy_spawns, item_spawns, tiles = arrays
+        level = cls(seed, floor, tiles, rooms, edges, (start_x, start_y), (stairs_x, stairs_y),
+                    enemy_spawns, item_spawns)
+        level.generation_ms = generation_ms
+        return level
+
+
+def _place_rooms(rng, width, height, floor):
+    """(N, 4) array of non-overlapping rooms with at least one wall tile between them"""
+    n = ROOM_CANDIDATES
+    w = rng.integers(MIN_ROOM_SIZE, MAX_ROOM_SIZE + 1, n)
+    h = rng.integers(MIN_ROOM_SIZE, MAX_ROOM_SIZE - 2, n)
+    x = rng.integers(1, width - w - 1)
+    y = rng.integers(1, height - h - 1)
+
+    # Every candidate against every other at once
+    overlap = ((x[:, None] <= x[None, :] + w[None, :]) & (x[None, :] <= x[:, None] + w[:, None]) &
+               (y[:, None] <= y[None, :] + h[None, :]) & (y[None, :] <= y[:, None] + h[:, None]))
+    wanted = min(BASE_ROOMS + floor - 1, MAX_ROOMS)
+    kept = np.zeros(n, dtype=bool)
+    for i in range(n):
+        if not (overlap[i] & kept).any():
+            kept[i] = True
+            wanted -= 1
+            if not wanted:
+                break
+    return np.stack((x, y, w, h), axis=1)[kept].astype(np.int32)
+
+
+def _room_centers(rooms):
+    return rooms[:, :2] + rooms[:, 2:] // 2
+
+
+def _connect_rooms(rng, rooms):
+    """(E, 2) room pairs: a minimum spanning tree over the room centers plus a few loops"""
+    centers = _room_centers(rooms).astype(np.float64)
+    n = len(rooms)
+    distance = np.sqrt(((centers[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2))
+
+    # Prim: grow the tree from room 0, always adding the closest room outside it
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    best = distance[0].copy()
+    parent = np.zeros(n, dtype=np.int32)
+    edges = []
+    for _ in range(n - 1):
+        room = int(np.where(in_tree, np.inf, best).argmin())
+        edges.append((parent[room], room))
+        in_tree[room] = True
+        closer = distance[room] < best
+        best[closer] = distance[room][closer]
+        parent[closer] = room
+
+    # Loops: some of the other short connections
+    if edges:
+        longest = max(distance[a, b] for a, b in edges)
+        a, b = np.triu_indices(n, 1)
+        tree = np.zeros((n, n), dtype=bool)
+        tree[tuple(np.array(edges).T)] = True
+        extra = (~tree[a, b] & ~tree[b, a] & (distance[a, b] <= longest) &
+                 (rng.random(len(a)) < LOOP_CHANCE))
+        edges.extend(zip(a[extra].tolist(), b[extra].tolist()))
+    return np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+
+def _carve(width, height, rooms, edges):
+    """Tile grid with the rooms and the L-shaped corridors between them carved out"""
+    ys, xs = np.ogrid[:height, :width]
+
+    x, y, w, h = (column[:, None, None] for column in rooms.T)
+    floor = ((xs >= x) & (xs < x + w) & (ys >= y) & (ys < y + h)).any(axis=0)
+
+    if len(edges):
+        centers = _room_centers(rooms)
+        (ax, ay), (bx, by) = centers[edges[:, 0]].T, centers[edges[:, 1]].T
+        ax, ay, bx, by = (column[:, None, None] for column in (ax, ay, bx, by))
+        # Horizontal leg along the first room's row, vertical leg along the second room's column
+        horizontal = (ys == ay) & (xs >= np.minimum(ax, bx)) & (xs <= np.maximum(ax, bx))
+        vertical = (xs == bx) & (ys >= np.minimum(ay, by)) & (ys <= np.maximum(ay, by))
+        floor |= (horizontal | vertical).any(axis=0)
+
+    return np.where(floor, FLOOR, WALL).astype(np.uint8)
+
+
+def flood_distances(tiles, start):
+    """Walking distance in tiles from start to every tile (-1 where unreachable)"""
+    # Flat grid with a wall border, so the 4 neighbours of index i are i +- 1 and i +- stride
+    height, width = tiles.shape
+    stride = width + 2
+    blocked = np.ones((height + 2, stride), dtype=bool)
+    blocked[1:-1, 1:-1] = tiles == WALL
+    blocked = blocked.ravel()
+    distance = np.full(blocked.shape, -1, dtype=np.int32)
+    neighbours = np.array((-1, 1, -stride, stride))
+
+    # Breadth first, one whole frontier of tile indices per step
+    frontier = np.array([(start[1] + 1) * stride + start[0] + 1])
+    blocked[frontier] = True
+    step = 0
+    while len(frontier):
+        distance[frontier] = step
+        frontier = np.unique((frontier[:, None] + neighbours).ravel())
+        frontier = frontier[~blocked[frontier]]
+        blocked[frontier] = True
+        step += 1
+    return distance.reshape(height + 2, stride)[1:-1, 1:-1]
+
+
+def _spawns(rng, rooms, skip, per_room, kinds):
+    """(K, 3) array of x, y, kind: up to per_room random tiles in every room but skip"""
+    counts = rng.integers(0, per_room + 1, len(rooms))
+    counts[skip] = 0
+    x, y, w, h = (np.repeat(column, counts) for column in rooms.T)
+    return np.stack((x + rng.integers(0, w), y + rng.integers(0, h),
+                     rng.integers(0, kinds, len(x))), axis=1).astype(np.int32)
+
+
+def generate_level(seed, floor, width=LEVEL_WIDTH, height=LEVEL_HEIGHT):
+    """Build floor number floor of the run seed, always the same for the same arguments"""
+    start_time = time.perf_counter()
+    for attempt in range(MAX_ATTEMPTS):
+        rng = np.random.default_rng((seed & MAX_SEED, floor, attempt))
+        rooms = _place_rooms(rng, width, height, floor)
+        edges = _connect_rooms(rng, rooms)
+        tiles = _carve(width, height, rooms, edges)
+
+        centers = _room_centers(rooms)
+        distance = flood_distances(tiles, centers[0])
+        room_distance = distance[centers[:, 1], centers[:, 0]]
+        if (room_distance >= 0).all():
+            break
+    else:
+        raise RuntimeError(f"Could not generate a connected floor {floor} for seed {seed}")
+
+    # Start in the first room, stairs down in the room farthest away on foot
+    start = tuple(centers[0].tolist())
+    stairs_room = int(room_distance.argmax())
+    stairs = tuple(centers[stairs_room].tolist())
+    tiles[stairs[1], stairs[0]] = STAIRS
+
+    # Deeper floors have more and tougher enemies
+    enemy_spawns = _spawns(rng, rooms, 0, 1 + floor // 2, min(1 + floor // 2, 4))
+    item_spawns = _spawns(rng, rooms, stairs_room, 1, 3)
+
+    for array in (tiles, rooms, edges, enemy_spawns, item_spawns):
+        array.flags.writeable = False
+    level = Level(seed, floor, tiles, rooms, edges, start, stairs, enemy_spawns, item_spawns)
+    level.generation_ms = (time.perf_counter() - start_time) * 1000
+    return level
+
+
+class LevelGenerator:
+    """
+    Generates castle floors and remembers the last ones by (seed, floor),
+    so going back to a floor or reloading a save returns the same Level
+    without generating it again.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.stats = {'hits': 0, 'misses': 0, 'over_budget': 0}
+
+    def generate(self, seed, floor):
+        key = (seed, floor)
+        level = self.cache.get(key)
+        if level is not None:
+            self.cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return level
+
+        level = generate_level(seed, floor)
+        self.stats['misses'] += 1
+        if level.generation_ms > GENERATION_BUDGET_MS:
+            self.stats['over_budget'] += 1
+            print(f"Floor {floor} took {level.generation_ms:.1f} ms to generate "
+                  f"(budget {GENERATION_BUDGET_MS:.0f} ms)")
+        self.add(level)
+        return level
+
+    def add(self, level):
+        """Cache a level generated elsewhere (e.g. by LevelPrefetcher)"""
+        self.cache[(level.seed, level.floor)] = level
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
@@ -0,0 +1,125 @@
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from model.level_generator import Level, generate_level
+
+
+def build_level_buffer(seed, floor):
+    """Worker process side: generate a floor and pack it for the trip back"""
+    return generate_level(seed, floor).to_buffer()
+
+
+class LevelPrefetcher:
+    """
+    Generates upcoming floors in a worker process while the current one is
+    being played.
+
+    prefetch() queues a floor, poll() (once per frame) adopts the finished
+    ones into the LevelGenerator cache, so taking the stairs finds the next
+    floor already there. The worker sends back a Level.to_buffer() bytes
+    object and the main process wraps it with Level.from_buffer() without
+    copying or parsing the arrays. cancel() drops whatever is still pending.
+    start() launches the worker ahead of time, so the first prefetch does
+    not wait for it.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.executor = None  # Started by start() or on the first prefetch
+        self.pending = {}  # (seed, floor) -> Future
+        self.stats = {'prefetched': 0, 'adopted': 0, 'waited': 0, 'cancelled': 0, 'failed': 0}
+
+    def prefetch(self, seed, floor):
+        """Start generating a floor in the background, unless it is cached or on its way"""
+        key = (seed, floor)
+        if key in self.generator.cache or key in self.pending:
+            return
+        self.start()
+        future = self._submit(build_level_buffer, seed, floor)
+        if future is not None:
+            self.pending[key] = future
+            self.stats['prefetched'] += 1
+
+    def start(self):
+        """Launch the worker process (takes a moment, a fresh interpreter has to import NumPy)"""
+        if self.executor is not None:
+            return
+        # Never fork the game itself (SDL and the audio threads are running by
+        # then): use a fork server that only imports the generator, or the
+        # platform default where there is none
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['model.level_generator'])
+        else:
+            context = multiprocessing.get_context()
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        # The pool starts its process on the first submit
+        self._submit(int)
+
+    def _submit(self, function, *args):
+        """
+        Submit work to the pool, or return None if the pool is gone. Prefetching
+        is only an optimisation: the floor is then generated in place when
+        needed, and the next prefetch starts a new pool.
+        """
+        if self.executor is None:
+            return None
+        try:
+            return self.executor.submit(function, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # The worker died (killed, out of memory...) or the pool was shut down
+            print(f"Level worker unavailable: {e}")
+            self.stats['failed'] += 1
+            self._drop_executor()
+            return None
+
+    def _drop_executor(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _adopt(self, key, future):
+        del self.pending[key]
+        try:
+            level = Level.from_buffer(future.result())
+        except CancelledError:
+            return
+        except BrokenProcessPool as e:
+            print(f"Prefetching floor {key[1]} failed, the level worker died: {e}")
+            self.stats['failed'] += 1
+            self._drop_executor()
+            return
+        except Exception as e:
+            # The floor will be generated in place when needed
+            print(f"Prefetching floor {key[1]} failed: {e}")
+            self.stats['failed'] += 1
+            return
+        self.generator.add(level)
+        self.stats['adopted'] += 1
+
+    def poll(self):
+        """Adopt the floors that finished generating"""
+        for key, future in list(self.pending.items()):
+            if future.done():
+                self._adopt(key, future)
+
+    def wait(self, seed, floor):
+        """Block until a pending floor is ready and adopt it (nothing to do if it is not pending)"""
+        key = (seed, floor)
+        future = self.pending.get(key)
+        if future is not None:
+            if not future.done():
+                self.stats['waited'] += 1
+            self._adopt(key, future)
+
+    def cancel(self):
+        """Forget every pending floor (a running one finishes in the worker and is dropped)"""
+        for future in self.pending.values():
+            future.cancel()
+        self.stats['cancelled'] += len(self.pending)
+        self.pending.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self._drop_executor()
@@ -0,0 +1,239 @@
+import math
+
+import numpy as np
+
+DEFAULT_CELL_SIZE = 64
+
+# Cell (cx, cy) is stored as the int64 key cx * KEY_STRIDE + cy + KEY_OFFSET,
+# so the neighbour (cx + dx, cy + dy) is simply key + dx * KEY_STRIDE + dy
+KEY_STRIDE = 1 << 32
+KEY_OFFSET = 1 << 31
+
+# Own cell plus the neighbours "after" it: every pair of neighbouring cells is
+# visited exactly once
+HALF_NEIGHBOURS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the entities of an EntityStore.
+
+    Call update() once per tick after the entities moved: only entities
+    that crossed into another cell are touched. Queries (radius, AABB,
+    nearest) look up the cells they cover as of that update and check the
+    current positions. candidate_pairs() updates first and returns every
+    pair of entities in the same or in neighbouring cells in one
+    vectorized pass.
+    """
+
+    def __init__(self, store, cell_size=DEFAULT_CELL_SIZE):
+        self.store = store
+        self.cell_size = cell_size
+        self.cells = {}  # cell key -> set of handles
+        self.handle_cell = {}  # handle -> cell key
+
+        # Handles and cell keys by store row as of the last update
+        self._version = None
+        self._handles = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._extent = (0, 0, 0, 0)  # Occupied cells: min cx, max cx, min cy, max cy
+        self.stats = {'updates': 0, 'moved': 0}
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _keys_for(self, positions):
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        return cells[:, 0] * KEY_STRIDE + cells[:, 1] + KEY_OFFSET
+
+    def _move(self, handle, key):
+        old = self.handle_cell.get(handle)
+        if old is not None:
+            cell = self.cells[old]
+            cell.discard(handle)
+            if not cell:
+                del self.cells[old]
+        self.cells.setdefault(key, set()).add(handle)
+        self.handle_cell[handle] = key
+        self.stats['moved'] += 1
+
+    def _remove(self, handle):
+        key = self.handle_cell.pop(handle)
+        cell = self.cells[key]
+        cell.discard(handle)
+        if not cell:
+            del self.cells[key]
+
+    def update(self):
+        """Bring the grid up to date with the store"""
+        keys = self._keys_for(self.store.positions)
+        self.stats['updates'] += 1
+
+        if self.store.version == self._version:
+            # Same entities in the same rows: only move the ones that changed cell
+            changed = keys != self._keys
+            if changed.any():
+                handles = self._handles
+                for i in np.flatnonzero(changed).tolist():
+                    self._move(int(handles[i]), int(keys[i]))
+                self._keys = keys
+                self._update_extent()
+            return
+
+        # Entities were created, destroyed or moved to other rows
+        handles = self.store.handles
+        current = dict(zip(handles.tolist(), keys.tolist()))
+        for handle in [h for h in self.handle_cell if h not in current]:
+            self._remove(handle)
+        for handle, key in current.items():
+            if self.handle_cell.get(handle) != key:
+                self._move(handle, key)
+
+        self._version = self.store.version
+        self._handles = handles
+        self._keys = keys
+        self._update_extent()
+
+    def _update_extent(self):
+        keys = self._keys
+        if len(keys):
+            rows = keys % KEY_STRIDE
+            self._extent = (int(keys.min() // KEY_STRIDE), int(keys.max() // KEY_STRIDE),
+                            int(rows.min()) - KEY_OFFSET, int(rows.max()) - KEY_OFFSET)
+
+    def _live(self, handles):
+        """Rows and handles of the entities still alive (some may be gone since the last update)"""
+        rows = [self.store.row(handle) for handle in handles]
+        if -1 in rows:
+            handles = [handle for handle, row in zip(handles, rows) if row >= 0]
+            rows = [row for row in rows if row >= 0]
+        return self.store.positions[rows], handles
+
+    def _gather(self, cx0, cy0, cx1, cy1):
+        """Handles in the cells of a rectangle of cells (inclusive)"""
+        found = []
+        cells = self.cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Query larger than the occupied area: walk the occupied cells instead
+            for key, handles in cells.items():
+                cx, cy = key // KEY_STRIDE, key % KEY_STRIDE - KEY_OFFSET
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.extend(handles)
+            return found
+        for cx in range(cx0, cx1 + 1):
+            base = cx * KEY_STRIDE + KEY_OFFSET
+            for cy in range(cy0, cy1 + 1):
+                handles = cells.get(base + cy)
+                if handles:
+                    found.extend(handles)
+        return found
+
+    def query_aabb(self, x0, y0, x1, y1):
+        """Handles of the entities inside the box [x0, x1] x [y0, y1]"""
+        cx0, cy0 = self._cell(x0, y0)
+        cx1, cy1 = self._cell(x1, y1)
+        positions, found = self._live(self._gather(cx0, cy0, cx1, cy1))
+        if not found:
+            return []
+        inside = ((positions[:, 0] >= x0) & (positions[:, 0] <= x1) &
+                  (positions[:, 1] >= y0) & (positions[:, 1] <= y1))
+        return np.asarray(found)[inside].tolist()
+
+    def query_radius(self, x, y, radius):
+        """Handles of the entities within radius of (x, y)"""
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        positions, found = self._live(self._gather(cx0, cy0, cx1, cy1))
+        if not found:
+            return []
+        offsets = positions - np.array((x, y), dtype=np.float32)
+        inside = (offsets ** 2).sum(axis=1) <= radius * radius
+        return np.asarray(found)[inside].tolist()
+
+    def nearest(self, x, y, max_distance=None, exclude=None):
+        """Handle of the entity closest to (x, y), or None if there is none (within max_distance)"""
+        if not self.cells:
+            return None
+        cx, cy = self._cell(x, y)
+
+        # Rings of cells around (cx, cy) worth visiting: up to max_distance or the occupied area
+        min_x, max_x, min_y, max_y = self._extent
+        max_ring = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+        if max_distance is not None:
+            max_ring = min(max_ring, int(math.ceil(max_distance / self.cell_size)))
+
+        best, best_d2 = None, math.inf
+        if max_distance is not None:
+            best_d2 = max_distance * max_distance
+        for ring in range(max_ring + 1):
+            if ring == 0:
+                found = self._gather(cx, cy, cx, cy)
+            else:
+                found = (self._gather(cx - ring, cy - ring, cx + ring, cy - ring) +
+                         self._gather(cx - ring, cy + ring, cx + ring, cy + ring) +
+                         self._gather(cx - ring, cy - ring + 1, cx - ring, cy + ring - 1) +
+                         self._gather(cx + ring, cy - ring + 1, cx + ring, cy + ring - 1))
+            if exclude is not None:
+                found = [handle for handle in found if handle != exclude]
+            positions, found = self._live(found)
+            if found:
+                offsets = positions - np.array((x, y), dtype=np.float32)
+                d2 = (offsets ** 2).sum(axis=1)
+                i = int(d2.argmin())
+                if d2[i] <= best_d2:
+                    best, best_d2 = found[i], float(d2[i])
+            # Anything beyond this ring is at least ring cells away
+            if best is not None and best_d2 <= (ring * self.cell_size) ** 2:
+                break
+        return best
+
+    def candidate_pairs(self, radius=None):
+        """
+        Return an (N, 2) array of handle pairs in the same or neighbouring
+        cells, each pair once. With radius (at most the cell size), only the
+        pairs closer than radius are kept.
+        """
+        self.update()
+        keys = self._keys
+        n = len(keys)
+        if n < 2:
+            return np.empty((0, 2), dtype=np.int64)
+
+        # Work in sorted order, where each occupied cell is a run of entities
+        order = np.argsort(keys, kind='stable')
+        cells, cell_start, cell_count = np.unique(keys[order], return_index=True, return_counts=True)
+        cell_of = np.repeat(np.arange(len(cells)), cell_count)
+        cell_end = cell_start + cell_count
+
+        firsts, seconds = [], []
+        for dx, dy in HALF_NEIGHBOURS:
+            if dx == 0 and dy == 0:
+                # Same cell: only the entities after this one, so each pair comes once
+                start = np.arange(1, n + 1)
+                counts = cell_end[cell_of] - start
+            else:
+                # Find the neighbouring cell among the occupied ones (sorted lookups are fast)
+                target = cells + (dx * KEY_STRIDE + dy)
+                index = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+                occupied = cells[index] == target
+                start = np.where(occupied, cell_start[index], 0)[cell_of]
+                counts = np.where(occupied, cell_count[index], 0)[cell_of]
+            total = int(counts.sum())
+            if not total:
+                continue
+            first = np.repeat(np.arange(n), counts)
+            group_start = np.repeat(np.cumsum(counts) - counts, counts)
+            second = np.repeat(start, counts) + np.arange(total) - group_start
+            firsts.append(order[first])
+            seconds.append(order[second])
+
+        if not firsts:
+            return np.empty((0, 2), dtype=np.int64)
+        first = np.concatenate(firsts)
+        second = np.concatenate(seconds)
+        if radius is not None:
+            positions = self.store.positions
+            offsets = positions[first] - positions[second]
+            close = (offsets ** 2).sum(axis=1) <= radius * radius
+            first, second = first[close], second[close]
+        return np.stack((self._handles[first], self._handles[second]), axis=1)
@@ -0,0 +1,351 @@
+"""
+Benchmarks for song_processing.
+
+Uses synthetic signals only, so no audio files are needed.
+
+Examples:
+  python benchmarks.py resample                             # 60 s stereo at 44.1 kHz
+  python benchmarks.py resample --seconds 300
+  python benchmarks.py chain --save baseline.json           # Full effect chain suite
+  python benchmarks.py chain --compare baseline.json        # Fail on regressions
+  python benchmarks.py verify                               # float32 chain vs the float64 one
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from datetime import datetime
+
+import numpy as np
+from pydub import AudioSegment
+
+from song_processing import (CONVERTERS, MODE_DEFAULTS, RESAMPLERS, _resample_audio,
+                             clip_stage, convert_streaming, distortion_stage,
+                             enhanced_chain, quantize_stage, square_wave_stage)
+
+
+SOURCE_RATE = 44100
+RESAMPLE_TARGETS = (6000, 8000, 11025)
+
+# Signals used by the chain suite: (seconds, channels)
+CHAIN_SIGNALS = ((10, 1), (10, 2), (60, 2), (300, 2))
+
+# Relative slowdown (or memory growth) accepted before --compare fails
+DEFAULT_THRESHOLD = 0.25
+
+# Absolute differences always accepted, so timer noise on tiny benchmarks is ignored
+MIN_REGRESSION = {'seconds': 0.005, 'peak_mb': 1.0}
+
+# Enhanced settings checked by verify: (bit_depth, square_wave_effect, quantize_factor)
+VERIFY_SETTINGS = ((8, 0.3, 0.8), (8, 0.0, 0.8), (8, 0.3, 0.0), (8, 0.1, 0.0), (8, 1.0, 0.5),
+                   (4, 0.3, 0.8), (12, 0.6, 0.9), (16, 0.3, 0.0))
+
+# Largest difference accepted with distortion on. Both chains get the same noise,
+# so only float32 rounding of the scaled sample can move it across an integer
+DISTORTION_TOLERANCE = 1
+
+
+def synthetic_signal(seconds, channels=2, frame_rate=SOURCE_RATE, seed=0):
+    """Return interleaved int16 samples: a few tones plus some noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * frame_rate)) / frame_rate
+    mono = (np.sin(2 * np.pi * 220 * t) * 0.4 +
+            np.sin(2 * np.pi * 1760 * t) * 0.2 +
+            rng.normal(0, 0.05, len(t)))
+    frames = np.stack([np.roll(mono, 50 * c) for c in range(channels)], axis=1)
+    return (np.clip(frames, -1, 1) * 20000).astype(np.int16).reshape(-1)
+
+
+def _tone_segment(frequency, seconds=2, frame_rate=SOURCE_RATE):
+    t = np.arange(int(seconds * frame_rate)) / frame_rate
+    samples = (np.sin(2 * np.pi * frequency * t) * 10000).astype(np.int16)
+    return AudioSegment(samples.tobytes(), frame_rate=frame_rate, sample_width=2, channels=1)
+
+
+def alias_level(resampler, target):
+    """
+    Level (dB relative to the input) left after resampling a tone that lies
+    above the target Nyquist frequency. Lower is better.
+    """
+    frequency = target * 0.625
+    segment = _resample_audio(_tone_segment(frequency), target, resampler)
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float64)
+    # Skip the edges, where the filter sees the zero padding
+    samples = samples[target // 10:-target // 10]
+    rms = np.sqrt(np.mean(samples ** 2))
+    return 20 * np.log10(max(rms, 1e-3) / (10000 / np.sqrt(2)))
+
+
+def benchmark_resamplers(seconds=60, repeat=3):
+    """Time every resampler at every target rate and print a table"""
+    samples = synthetic_signal(seconds)
+    audio = AudioSegment(samples.tobytes(), frame_rate=SOURCE_RATE, sample_width=2, channels=2)
+
+    print(f"Resampling {seconds}s of stereo audio from {SOURCE_RATE} Hz (best of {repeat})\n")
+    print(f"{'target':>8} {'resampler':>10} {'time (s)':>10} {'x realtime':>11} {'alias (dB)':>11}")
+    results = []
+    for target in RESAMPLE_TARGETS:
+        for resampler in RESAMPLERS:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _resample_audio(audio, target, resampler)
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            alias = alias_level(resampler, target)
+            results.append({'target': target, 'resampler': resampler,
+                            'seconds': best, 'alias_db': alias})
+            print(f"{target:>8} {resampler:>10} {best:>10.3f} {seconds / best:>11.0f} {alias:>11.1f}")
+    return results
+
+
+def _measure(function, repeat):
+    """Return the best time of repeat calls and the peak traced memory in MB"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / (1024 * 1024)
+
+
+def _wav_bytes(samples, channels):
+    """Encode int16 samples as an in-memory WAV file"""
+    data = io.BytesIO()
+    with wave.open(data, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(SOURCE_RATE)
+        wav.writeframes(samples.tobytes())
+    return data.getvalue()
+
+
+def _quiet(function):
+    """Wrap function so it runs with stdout discarded (the converters print every file)"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+    return run
+
+
+def _stage_benchmarks(audio):
+    """Yield (stage, function) pairs timing each step of the enhanced chain"""
+    settings = MODE_DEFAULTS['enhanced']
+    bit_depth = settings['bit_depth']
+    max_val = 2**(bit_depth-1) - 1
+    quantize_steps = int(max(2, (2**bit_depth) * (1 - settings['quantize_factor'])))
+    
+    resampled = _resample_audio(audio, settings['sample_rate'], settings['resampler'])
+    samples = np.frombuffer(resampled.raw_data, dtype=np.int16)
+    buf = np.empty(len(samples), dtype=np.float32)
+    scratch = np.empty(len(samples), dtype=np.float32)
+    
+    def run_stage(stage):
+        def run():
+            np.copyto(buf, samples, casting='unsafe')
+            stage(buf, scratch)
+        return run
+    
+    def export():
+        resampled.export(io.BytesIO(), format='wav')
+    
+    yield 'resample', lambda: _resample_audio(audio, settings['sample_rate'], settings['resampler'])
+    yield 'quantize', run_stage(quantize_stage(quantize_steps))
+    yield 'square_wave', run_stage(square_wave_stage(settings['square_wave_effect'], max_val))
+    yield 'distortion', run_stage(distortion_stage(settings['distortion'], np.random.default_rng(0)))
+    yield 'clip', run_stage(clip_stage(max_val))
+    yield 'export', export
+
+
+def benchmark_chain(signals=CHAIN_SIGNALS, repeat=3):
+    """
+    Time every mode (in memory and streaming) and every stage of the
+    enhanced chain on synthetic signals, recording peak memory.
+    
+    Returns a dict of results keyed by benchmark name.
+    """
+    results = {}
+    
+    def record(name, function):
+        seconds, peak_mb = _measure(function, repeat)
+        results[name] = {'seconds': seconds, 'peak_mb': peak_mb}
+        print(f"{name:<40} {seconds:>9.3f} {peak_mb:>10.1f}")
+    
+    print(f"{'benchmark':<40} {'time (s)':>9} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for seconds, channels in signals:
+            label = f"{seconds}s/{channels}ch"
+            wav_data = _wav_bytes(synthetic_signal(seconds, channels), channels)
+            wav_path = os.path.join(temp_dir, 'input.wav')
+            with open(wav_path, 'wb') as f:
+                f.write(wav_data)
+            output = os.path.join(temp_dir, 'output.wav')
+            
+            def decode():
+                return AudioSegment.from_file(io.BytesIO(wav_data), format='wav')
+            
+            record(f"stage/decode/{label}", decode)
+            audio = decode()
+            for stage, function in _stage_benchmarks(audio):
+                record(f"stage/{stage}/{label}", function)
+            
+            for mode, convert in CONVERTERS.items():
+                record(f"mode/{mode}/{label}", _quiet(lambda: convert(decode(), output)))
+                record(f"stream/{mode}/{label}",
+                       _quiet(lambda: convert_streaming(wav_path, output, mode=mode)))
+    return results
+
+
+def save_results(results, path):
+    """Write benchmark results and some environment details to a JSON file"""
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved as: {path}")
+
+
+def compare_results(results, baseline_path, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against a saved run and print every regression.
+    
+    A benchmark regresses when its time or peak memory grew by more than
+    threshold (0.25 = 25%) and by more than MIN_REGRESSION. Returns the
+    number of regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    
+    print(f"\nComparing with {baseline_path} (threshold {threshold:.0%})")
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            old, new = baseline[name][metric], result[metric]
+            if new > old * (1 + threshold) and new - old > MIN_REGRESSION[metric]:
+                regressions += 1
+                print(f"  REGRESSION {name} {metric}: {old:.3f} -> {new:.3f} ({new / old - 1:+.0%})")
+    
+    if regressions:
+        print(f"{regressions} regressions found")
+    else:
+        print("No regressions")
+    return regressions
+
+
+def _reference_enhanced_effects(samples, bit_depth, square_wave_effect, quantize_factor, distortion,
+                                noise=None):
+    """
+    The float64 enhanced chain that EffectChain replaced, kept as a reference.
+    noise replaces its uniform(-0.1, 0.1) distortion draw, see chain_noise().
+    """
+    max_val = 2**(bit_depth-1) - 1
+    if quantize_factor > 0:
+        quantize_steps = int(max(2, (2**bit_depth) * (1 - quantize_factor)))
+        samples = (samples // quantize_steps) * quantize_steps
+    if square_wave_effect > 0:
+        samples_normalized = samples / max_val
+        square_samples = np.sign(samples_normalized) * np.power(np.abs(samples_normalized), 0.3) * max_val
+        samples = samples * (1 - square_wave_effect) + square_samples * square_wave_effect
+    if distortion > 0:
+        if noise is None:
+            noise = np.random.uniform(-0.1, 0.1, size=len(samples))
+        samples = samples * (1 + distortion * noise)
+    return np.clip(samples, -max_val, max_val).astype(np.int16)
+
+
+def chain_noise(count, seed):
+    """The distortion noise of enhanced_chain(..., seed) processing count samples, as uniform(-0.1, 0.1)"""
+    uniform = np.random.default_rng(seed).random(count, dtype=np.float32)
+    return uniform.astype(np.float64) * 0.2 - 0.1
+
+
+def verify_chain(seconds=10, distortion=MODE_DEFAULTS['enhanced']['distortion']):
+    """
+    Compare the float32 EffectChain with the float64 reference on synthetic
+    signals: bit-identical with distortion off, and within
+    DISTORTION_TOLERANCE with distortion on (same noise for both). Returns
+    the number of failures.
+    """
+    print(f"{'signal':<8} {'settings':<14} {'distortion':>10} {'max diff':>9} {'result':>7}")
+    failures = 0
+    for channels in (1, 2):
+        samples = synthetic_signal(seconds, channels)
+        for bit_depth, square_wave_effect, quantize_factor in VERIFY_SETTINGS:
+            for amount, tolerance in ((0, 0), (distortion, DISTORTION_TOLERANCE)):
+                expected = _reference_enhanced_effects(samples, bit_depth, square_wave_effect,
+                                                       quantize_factor, amount, chain_noise(len(samples), 0))
+                chain = enhanced_chain(bit_depth, square_wave_effect, quantize_factor, amount, seed=0)
+                actual = chain.process(samples)
+                diff = int(np.abs(actual.astype(np.int32) - expected).max())
+                ok = actual.dtype == expected.dtype and diff <= tolerance
+                failures += not ok
+                settings = f"{bit_depth}/{square_wave_effect}/{quantize_factor}"
+                print(f"{channels}ch{'':<5} {settings:<14} {amount:>10} {diff:>9} {'ok' if ok else 'FAIL':>7}")
+    
+    print(f"\n{failures} mismatches found" if failures else "\nEffectChain matches the float64 chain")
+    return failures
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmarks de song_processing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    resample = subparsers.add_parser('resample', help='Comparar los conversores de tasa de muestreo')
+    resample.add_argument('--seconds', type=float, default=60,
+                          help='Duración de la señal sintética (por defecto: 60)')
+    resample.add_argument('--repeat', type=int, default=3,
+                          help='Repeticiones por medida, se queda con la mejor (por defecto: 3)')
+    
+    chain = subparsers.add_parser('chain', help='Medir cada modo y cada etapa de la cadena de efectos')
+    chain.add_argument('--quick', action='store_true',
+                       help='Solo señales cortas (para pruebas rápidas)')
+    chain.add_argument('--repeat', type=int, default=3,
+                       help='Repeticiones por medida, se queda con la mejor (por defecto: 3)')
+    chain.add_argument('--save', help='Guardar los resultados en este archivo JSON')
+    chain.add_argument('--compare', help='Comparar con un JSON guardado y fallar si hay regresiones')
+    chain.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                       help=f'Empeoramiento relativo tolerado (por defecto: {DEFAULT_THRESHOLD})')
+    
+    verify = subparsers.add_parser('verify', help='Comparar la cadena float32 con la versión float64 original')
+    verify.add_argument('--seconds', type=float, default=10,
+                        help='Duración de la señal sintética (por defecto: 10)')
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.command == 'resample':
+        benchmark_resamplers(args.seconds, args.repeat)
+    elif args.command == 'chain':
+        signals = CHAIN_SIGNALS[:2] if args.quick else CHAIN_SIGNALS
+        results = benchmark_chain(signals, args.repeat)
+        if args.save:
+            save_results(results, args.save)
+        if args.compare and compare_results(results, args.compare, args.threshold):
+            sys.exit(1)
+    elif args.command == 'verify':
+        if verify_chain(args.seconds):
+            sys.exit(1)
@@ -1,27 +1,266 @@
 from pydub import AudioSegment
+from pydub.utils import db_to_float, get_encoder_name, mediainfo_json
 import numpy as np
-import simpleaudio as sa 
 import os
 import sys
 import argparse
+import audioop
+import glob
+import hashlib
+import json
+import shutil
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from math import gcd
+from numpy.lib.stride_tricks import as_strided
 from pathlib import Path
 
 
-def convert_to_8bit_simple(input_file, output_file=None, sample_rate=8000, bit_depth=8):
+# Default block size for streaming conversion (frames per block)
+DEFAULT_BLOCK_FRAMES = 65536
+
+# Default parameters for each conversion mode
+MODE_DEFAULTS = {
+    'simple': {'sample_rate': 8000, 'bit_depth': 8, 'resampler': 'linear'},
+    'enhanced': {'sample_rate': 8000, 'bit_depth': 8, 'square_wave_effect': 0.3,
+                 'quantize_factor': 0.8, 'distortion': 0.2, 'seed': None,
+                 'resampler': 'linear'},
+    'chiptune': {'sample_rate': 11025, 'bit_depth': 8, 'arpeggio_effect': 0.2,
+                 'resampler': 'linear'},
+}
+
+# Sample rate converters: NumPy linear, NumPy windowed-sinc, or pydub's audioop
+RESAMPLERS = ('linear', 'sinc', 'audioop')
+
+# Windowed-sinc resampler settings
+SINC_ZERO_CROSSINGS = 16  # Kernel half-width in zero crossings (more = sharper filter)
+SINC_ROLLOFF = 0.95  # Cutoff as a fraction of the output Nyquist frequency
+SINC_KAISER_BETA = 8.6
+
+# Suffix added to the input name when no output file is given
+MODE_SUFFIXES = {
+    'simple': '_simple_8bit',
+    'enhanced': '_enhanced_8bit',
+    'chiptune': '_chiptune',
+}
+
+# Sample range covered by the square wave table (quantizing can round int16 samples below -32768)
+SQUARE_TABLE_MIN = -65536
+SQUARE_TABLE_MAX = 32767
+
+# Volume boost (dB) applied after the enhanced effects
+ENHANCED_GAIN_DB = 3
+
+# File extensions picked up when a directory is given to the batch command
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac', '.aif', '.aiff', '.opus')
+
+# Conversion cache location and size (override the location with SONG_PROCESSING_CACHE)
+DEFAULT_CACHE_DIR = os.environ.get(
+    'SONG_PROCESSING_CACHE',
+    os.path.join(Path.home(), '.cache', 'economato-textil', 'song_processing'))
+DEFAULT_CACHE_SIZE_MB = 1024
+
+# Bump when an effect changes so renders cached by older code are not reused
+CACHE_VERSION = 4
+
+
+def _load_audio(input_file):
+    """Decode input_file, or return it unchanged if it is already an AudioSegment"""
+    if isinstance(input_file, AudioSegment):
+        return input_file
+    return AudioSegment.from_file(input_file)
+
+
+def _output_path(input_file, output_file, mode):
+    """Return the output WAV path, generating one from the input name if needed"""
+    if output_file is None:
+        if isinstance(input_file, AudioSegment):
+            raise ValueError("output_file is required when converting an AudioSegment")
+        return f"{Path(input_file).stem}{MODE_SUFFIXES[mode]}.wav"
+    output_file = str(output_file)
+    if not output_file.endswith('.wav'):
+        output_file += '.wav'
+    return output_file
+
+
+def _simple_effects(samples, bit_depth):
+    """Clip samples to the range of the target bit depth"""
+    return np.clip(samples, -2**(bit_depth-1), 2**(bit_depth-1)-1)
+
+
+class EffectChain:
+    """
+    Runs a list of effect stages in place on a reusable float32 buffer.
+    
+    A stage is a callable stage(buf, scratch) that modifies buf in place and
+    may use scratch (same size) as temporary storage. The buffers only grow,
+    so processing consecutive blocks allocates nothing but the int16 result.
+    """
+    
+    def __init__(self, stages):
+        self.stages = stages
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._scratch = np.empty(0, dtype=np.float32)
+    
+    def process(self, samples):
+        """Run every stage over samples and return them as int16"""
+        n = len(samples)
+        if len(self._buffer) < n:
+            self._buffer = np.empty(n, dtype=np.float32)
+            self._scratch = np.empty(n, dtype=np.float32)
+        buf = self._buffer[:n]
+        scratch = self._scratch[:n]
+        
+        np.copyto(buf, samples, casting='unsafe')
+        for stage in self.stages:
+            stage(buf, scratch)
+        
+        # Truncates towards zero, like astype(np.int16)
+        out = np.empty(n, dtype=np.int16)
+        np.copyto(out, buf, casting='unsafe')
+        return out
+
+
+def quantize_stage(steps):
+    """Round samples down to multiples of steps"""
+    def stage(buf, scratch):
+        # divide + floor is much faster than np.floor_divide on floats
+        np.divide(buf, steps, out=buf)
+        np.floor(buf, out=buf)
+        np.multiply(buf, steps, out=buf)
+    return stage
+
+
+@lru_cache(maxsize=8)
+def _square_wave_table(amount, max_val):
+    """
+    The square wave blend of every whole sample value, computed in float64
+    and rounded towards zero to float32, so truncating it to int16 gives
+    exactly what the float64 computation would.
+    """
+    values = np.arange(SQUARE_TABLE_MIN, SQUARE_TABLE_MAX + 1, dtype=np.float64)
+    normalized = values / max_val
+    square = np.sign(normalized) * np.power(np.abs(normalized), 0.3) * max_val
+    exact = values * (1 - amount) + square * amount
+    table = exact.astype(np.float32)
+    rounded_up = np.abs(table) > np.abs(exact)
+    table[rounded_up] = np.nextafter(table[rounded_up], np.float32(0))
+    return table
+
+
+def square_wave_stage(amount, max_val):
+    """
+    Blend samples with sign(x) * |x / max_val|^0.3 * max_val.
+    
+    Samples must still be whole numbers (int16 input, maybe quantized with
+    whole steps), so the blend is a lookup into _square_wave_table.
+    """
+    table = _square_wave_table(amount, max_val)
+    
+    def stage(buf, scratch):
+        # scratch is reused as the integer index buffer
+        index = scratch.view(np.int32)
+        np.copyto(index, buf, casting='unsafe')
+        np.subtract(index, SQUARE_TABLE_MIN, out=index)
+        np.take(table, index, out=buf, mode='clip')
+    return stage
+
+
+def distortion_stage(amount, rng):
+    """Scale every sample by a random factor in 1 +/- 0.1 * amount"""
+    def stage(buf, scratch):
+        # Uniform noise in [0, 1), mapped to [1 - 0.1 * amount, 1 + 0.1 * amount)
+        rng.random(dtype=np.float32, out=scratch)
+        np.multiply(scratch, 0.2 * amount, out=scratch)
+        np.add(scratch, 1 - 0.1 * amount, out=scratch)
+        np.multiply(buf, scratch, out=buf)
+    return stage
+
+
+def clip_stage(max_val):
+    """Hard clip samples to +/- max_val"""
+    def stage(buf, scratch):
+        np.clip(buf, -max_val, max_val, out=buf)
+    return stage
+
+
+def enhanced_chain(bit_depth, square_wave_effect, quantize_factor, distortion, seed=None):
+    """Build the EffectChain of the enhanced 8-bit mode"""
+    # Apply bit depth reduction (bit crushing)
+    max_val = 2**(bit_depth-1) - 1
+    stages = []
+    
+    # Quantization effect (reduces effective resolution)
+    if quantize_factor > 0:
+        quantize_steps = int(max(2, (2**bit_depth) * (1 - quantize_factor)))
+        stages.append(quantize_stage(quantize_steps))
+    
+    # Square wave transformation (makes waveforms more digital/square)
+    if square_wave_effect > 0:
+        stages.append(square_wave_stage(square_wave_effect, max_val))
+    
+    # Add some distortion
+    if distortion > 0:
+        stages.append(distortion_stage(distortion, np.random.default_rng(seed)))
+    
+    # Hard clip to ensure we stay within bit depth range
+    stages.append(clip_stage(max_val))
+    return EffectChain(stages)
+
+
+def _chiptune_effects(samples, bit_depth, arpeggio_effect, offset=0, total=None):
+    """
+    Apply the chiptune effect chain and return int16 samples.
+    
+    offset and total locate the samples inside the whole track so the
+    arpeggio sweep stays continuous when the track is processed in blocks.
+    """
+    max_val = 2**(bit_depth-1) - 1
+    if total is None:
+        total = len(samples)
+    
+    # Apply hard quantization (very characteristic of chiptunes)
+    quantize_steps = 16  # Fewer steps = more "steppy" sound
+    samples = (samples // quantize_steps) * quantize_steps
+    
+    # Apply pulse-wave like effect (very square, like NES)
+    # Only the sign matters, so silent blocks don't divide by zero
+    pulse_samples = np.sign(samples) * max_val * 0.8
+    samples = samples * 0.2 + pulse_samples * 0.8
+    
+    # Add "arpeggio" effect (rapid note changes common in chiptunes)
+    if arpeggio_effect > 0:
+        # Create a tremolo-like effect that mimics arpeggios (8 sweeps over the track)
+        position = np.arange(offset, offset + len(samples)) / max(total - 1, 1)
+        tremolo = np.sin(2 * np.pi * 8 * position) * arpeggio_effect
+        samples = samples * (1 + tremolo)
+    
+    # Hard clip to ensure we stay within range
+    return np.clip(samples, -max_val, max_val).astype(np.int16)
+
+
+def convert_to_8bit_simple(input_file, output_file=None, sample_rate=8000, bit_depth=8,
+                           resampler='linear'):
     """
     Simple 8-bit conversion with basic sample rate and bit depth reduction.
     This is the original algorithm.
+    
+    input_file may also be an already decoded AudioSegment. resampler is
+    one of RESAMPLERS.
     """
-    # Load audio file
-    audio = AudioSegment.from_file(input_file)
+    # Load audio file (or reuse an already decoded one)
+    audio = _load_audio(input_file)
 
     # Reducir tasa de muestreo
-    audio = audio.set_frame_rate(sample_rate)
+    audio = _resample_audio(audio, sample_rate, resampler)
     audio = audio.set_sample_width(bit_depth // 8)
 
     # Aplicar distorsion
     samples = np.array(audio.get_array_of_samples())
-    samples = np.clip(samples, -2**(bit_depth-1), 2**(bit_depth-1)-1)
+    samples = _simple_effects(samples, bit_depth)
 
     # Crear nuevo segmento de audio
     new_audio = AudioSegment(
@@ -32,11 +271,7 @@ def convert_to_8bit_simple(input_file, output_file=None, sample_rate=8000, bit_d
     )
 
     # Generar nombre de salida si no se especificó
-    if output_file is None:
-        input_path = Path(input_file)
-        output_file = f"{input_path.stem}_simple_8bit.wav"
-    elif not output_file.endswith('.wav'):
-        output_file += '.wav'
+    output_file = _output_path(input_file, output_file, 'simple')
     
     # Guardar archivo
     new_audio.export(output_file, format="wav")
@@ -46,66 +281,48 @@ def convert_to_8bit_simple(input_file, output_file=None, sample_rate=8000, bit_d
 
 
 def convert_to_8bit(input_file, output_file=None, sample_rate=8000, bit_depth=8, 
-                   square_wave_effect=0.3, quantize_factor=0.8, distortion=0.2):
+                   square_wave_effect=0.3, quantize_factor=0.8, distortion=0.2, seed=None,
+                   resampler='linear'):
     """
     Convert audio to 8-bit style with various retro effects.
     
     Parameters:
-    - input_file: Path to input audio file
+    - input_file: Path to input audio file, or an already decoded AudioSegment
     - output_file: Path to output audio file (without extension)
     - sample_rate: Target sample rate (lower = more retro)
     - bit_depth: Target bit depth (8 is classic 8-bit)
     - square_wave_effect: Amount of square wave transformation (0-1)
     - quantize_factor: Strength of quantization effect (0-1)
     - distortion: Amount of distortion to add (0-1)
+    - seed: Seed for the distortion noise (None = different every run)
+    - resampler: Sample rate converter, one of RESAMPLERS
     """
-    # Load audio file
-    audio = AudioSegment.from_file(input_file)
+    # Load audio file (or reuse an already decoded one)
+    audio = _load_audio(input_file)
     
     # Reduce sample rate (more dramatic for 8-bit feel)
-    audio = audio.set_frame_rate(sample_rate)
+    audio = _resample_audio(audio, sample_rate, resampler)
     
     # Get samples as numpy array
     samples = np.array(audio.get_array_of_samples())
     
-    # Apply bit depth reduction (bit crushing)
-    max_val = 2**(bit_depth-1) - 1
-    
-    # Quantization effect (reduces effective resolution)
-    if quantize_factor > 0:
-        quantize_steps = int(max(2, (2**bit_depth) * (1 - quantize_factor)))
-        samples = (samples // quantize_steps) * quantize_steps
-    
-    # Square wave transformation (makes waveforms more digital/square)
-    if square_wave_effect > 0:
-        samples_normalized = samples / max_val
-        square_samples = np.sign(samples_normalized) * np.power(np.abs(samples_normalized), 0.3) * max_val
-        samples = samples * (1 - square_wave_effect) + square_samples * square_wave_effect
-    
-    # Add some distortion
-    if distortion > 0:
-        samples = samples * (1 + distortion * np.random.uniform(-0.1, 0.1, size=len(samples)))
-    
-    # Hard clip to ensure we stay within bit depth range
-    samples = np.clip(samples, -max_val, max_val).astype(np.int16)
+    # Bit crushing, quantization, square wave and distortion
+    chain = enhanced_chain(bit_depth, square_wave_effect, quantize_factor, distortion, seed)
+    samples = chain.process(samples)
     
     # Create new audio segment
     new_audio = AudioSegment(
         samples.tobytes(),
         frame_rate=sample_rate,
-        sample_width=bit_depth // 4,  # Ensure we have at least 16-bit container
+        sample_width=2,  # Samples are int16, so always use a 16-bit container
         channels=audio.channels
     )
     
     # Add final touch - slight volume boost to compensate for bit reduction
-    new_audio = new_audio + 3
+    new_audio = new_audio + ENHANCED_GAIN_DB
     
     # Generar nombre de salida si no se especificó
-    if output_file is None:
-        input_path = Path(input_file)
-        output_file = f"{input_path.stem}_enhanced_8bit.wav"
-    elif not output_file.endswith('.wav'):
-        output_file += '.wav'
+    output_file = _output_path(input_file, output_file, 'enhanced')
     
     # Save file with extension
     new_audio.export(output_file, format="wav")
@@ -115,44 +332,29 @@ def convert_to_8bit(input_file, output_file=None, sample_rate=8000, bit_depth=8,
 
 
 def convert_to_chiptune(input_file, output_file=None, sample_rate=11025, 
-                       bit_depth=8, arpeggio_effect=0.2):
+                       bit_depth=8, arpeggio_effect=0.2, resampler='linear'):
     """
     Convert audio to chiptune style with classic video game console effects.
     
     Parameters:
-    - input_file: Path to input audio file
+    - input_file: Path to input audio file, or an already decoded AudioSegment
     - output_file: Path to output audio file (without extension)
     - sample_rate: Target sample rate (11025 is common for chiptunes)
     - bit_depth: Target bit depth
     - arpeggio_effect: Amount of arpeggio-like effect (0-1)
+    - resampler: Sample rate converter, one of RESAMPLERS
     """
-    # Load audio file
-    audio = AudioSegment.from_file(input_file)
+    # Load audio file (or reuse an already decoded one)
+    audio = _load_audio(input_file)
     
     # Reduce sample rate to chiptune standard
-    audio = audio.set_frame_rate(sample_rate)
+    audio = _resample_audio(audio, sample_rate, resampler)
     
     # Get samples as numpy array
     samples = np.array(audio.get_array_of_samples())
-    max_val = 2**(bit_depth-1) - 1
     
-    # Apply hard quantization (very characteristic of chiptunes)
-    quantize_steps = 16  # Fewer steps = more "steppy" sound
-    samples = (samples // quantize_steps) * quantize_steps
-    
-    # Apply pulse-wave like effect (very square, like NES)
-    samples_normalized = samples / np.max(np.abs(samples))
-    pulse_samples = np.sign(samples_normalized) * max_val * 0.8
-    samples = samples * 0.2 + pulse_samples * 0.8
-    
-    # Add "arpeggio" effect (rapid note changes common in chiptunes)
-    if arpeggio_effect > 0:
-        # Create a tremolo-like effect that mimics arpeggios
-        tremolo = np.sin(np.linspace(0, 2 * np.pi * 8, len(samples))) * arpeggio_effect
-        samples = samples * (1 + tremolo)
-    
-    # Hard clip to ensure we stay within range
-    samples = np.clip(samples, -max_val, max_val).astype(np.int16)
+    # Quantization, pulse wave and arpeggio
+    samples = _chiptune_effects(samples, bit_depth, arpeggio_effect)
     
     # Create new audio segment
     new_audio = AudioSegment(
@@ -163,11 +365,7 @@ def convert_to_chiptune(input_file, output_file=None, sample_rate=11025,
     )
     
     # Generar nombre de salida si no se especificó
-    if output_file is None:
-        input_path = Path(input_file)
-        output_file = f"{input_path.stem}_chiptune.wav"
-    elif not output_file.endswith('.wav'):
-        output_file += '.wav'
+    output_file = _output_path(input_file, output_file, 'chiptune')
     
     # Save file with extension
     new_audio.export(output_file, format="wav")
@@ -176,6 +374,823 @@ def convert_to_chiptune(input_file, output_file=None, sample_rate=11025,
     return new_audio
 
 
+def _mode_settings(mode, params):
+    """Merge user parameters over the defaults of a mode, rejecting unknown ones"""
+    if mode not in MODE_DEFAULTS:
+        raise ValueError(f"Unknown conversion mode: {mode}")
+    unknown = set(params) - set(MODE_DEFAULTS[mode])
+    if unknown:
+        raise TypeError(f"Unexpected parameters for mode '{mode}': {', '.join(sorted(unknown))}")
+    settings = dict(MODE_DEFAULTS[mode])
+    settings.update(params)
+    return settings
+
+
+class SourceStream:
+    """
+    Reads an audio file as blocks of interleaved int16 samples.
+    
+    WAV files are read with the wave module. Any other format is decoded by
+    piping it through ffmpeg (the decoder pydub uses), so the whole track is
+    never held in memory. total_frames comes from the WAV header, or is
+    estimated from the duration ffmpeg reports until count_frames() is called.
+    """
+    
+    def __init__(self, input_file, block_frames=DEFAULT_BLOCK_FRAMES):
+        self.input_file = str(input_file)
+        self.block_frames = block_frames
+        self.is_wav = self._probe_wav()
+        self.exact_frames = self.is_wav
+        if not self.is_wav:
+            self._probe_ffmpeg()
+    
+    def _probe_wav(self):
+        """Read the WAV header, returning False if the file must go through ffmpeg"""
+        try:
+            with wave.open(self.input_file, 'rb') as wav:
+                self.channels = wav.getnchannels()
+                self.frame_rate = wav.getframerate()
+                self.total_frames = wav.getnframes()
+                self.sample_width = wav.getsampwidth()
+            return True
+        except (wave.Error, EOFError):
+            return False
+    
+    def _probe_ffmpeg(self):
+        info = mediainfo_json(self.input_file)
+        audio_streams = [s for s in info['streams'] if s.get('codec_type') == 'audio']
+        if not audio_streams:
+            raise ValueError(f"No audio stream found in {self.input_file}")
+        stream = audio_streams[0]
+        self.channels = int(stream['channels'])
+        self.frame_rate = int(stream['sample_rate'])
+        duration = float(stream.get('duration') or info['format']['duration'])
+        self.total_frames = int(round(duration * self.frame_rate))
+        self.sample_width = 2
+    
+    def count_frames(self):
+        """Make total_frames exact, decoding the whole track once if it is not a WAV file"""
+        if not self.exact_frames:
+            self.total_frames = sum(len(block) for block in self._iter_ffmpeg()) // self.channels
+            self.exact_frames = True
+        return self.total_frames
+    
+    def __iter__(self):
+        if self.is_wav:
+            return self._iter_wav()
+        return self._iter_ffmpeg()
+    
+    def _iter_wav(self):
+        with wave.open(self.input_file, 'rb') as wav:
+            while True:
+                data = wav.readframes(self.block_frames)
+                if not data:
+                    break
+                if self.sample_width == 1:
+                    # 8-bit WAV is unsigned, same conversion pydub does
+                    data = audioop.bias(data, 1, -128)
+                if self.sample_width != 2:
+                    data = audioop.lin2lin(data, self.sample_width, 2)
+                yield np.frombuffer(data, dtype=np.int16)
+    
+    def _iter_ffmpeg(self):
+        command = [
+            get_encoder_name(), '-nostdin', '-loglevel', 'error',
+            '-i', self.input_file,
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', str(self.channels), '-ar', str(self.frame_rate),
+            '-',
+        ]
+        block_bytes = self.block_frames * self.channels * 2
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                # Drop any trailing partial frame
+                data = data[:len(data) - len(data) % (self.channels * 2)]
+                if not data:
+                    break
+                yield np.frombuffer(data, dtype=np.int16)
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+
+
+class RateConverter:
+    """
+    Sample rate conversion for consecutive int16 blocks.
+    
+    Uses the same audioop.ratecv call as AudioSegment.set_frame_rate, but
+    keeps its state between blocks so the result has no seams.
+    """
+    
+    def __init__(self, channels, in_rate, out_rate):
+        self.channels = channels
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.state = None
+    
+    def process(self, samples):
+        if self.in_rate == self.out_rate:
+            return samples
+        data, self.state = audioop.ratecv(samples.tobytes(), 2, self.channels,
+                                          self.in_rate, self.out_rate, self.state)
+        return np.frombuffer(data, dtype=np.int16)
+    
+    def flush(self):
+        # ratecv never holds samples back
+        return np.empty(0, dtype=np.int16)
+    
+    def output_frames(self, frames):
+        """Number of frames the conversion of frames input frames produces"""
+        if self.in_rate == self.out_rate or frames == 0:
+            return frames
+        divisor = gcd(self.in_rate, self.out_rate)
+        # ratecv emits one frame for the first input, then one per in_rate / out_rate inputs
+        return (frames - 1) * (self.out_rate // divisor) // (self.in_rate // divisor) + 1
+
+
+class Resampler:
+    """
+    NumPy sample rate conversion for consecutive int16 blocks.
+    
+    The rate ratio is reduced to up/down, so output frame k sits exactly at
+    input position k * down / up. Each output frame is a weighted sum of the
+    input frames around it, with weights precomputed for each of the up
+    possible fractional positions (a polyphase filter bank).
+    
+    Modes:
+    - 'linear': interpolates between the two neighbouring frames. It is
+      fast, but has no anti-aliasing filter. With an integer ratio
+      (44100 -> 11025) it is plain decimation.
+    - 'sinc': Kaiser-windowed sinc low-pass with its cutoff just below the
+      smaller Nyquist frequency. It is slower but does not alias.
+    
+    The input frames still needed by the next output frames are kept
+    between calls, so blocks join without seams. Call flush() once after
+    the last block to get the tail.
+    """
+    
+    def __init__(self, channels, in_rate, out_rate, mode='linear'):
+        if mode not in ('linear', 'sinc'):
+            raise ValueError(f"Unknown resampler mode: {mode}")
+        self.channels = channels
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.mode = mode
+        
+        divisor = gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        
+        if mode == 'linear':
+            self.half = 1
+        else:
+            cutoff = 0.5 * min(1.0, out_rate / in_rate) * SINC_ROLLOFF
+            self.half = int(np.ceil(SINC_ZERO_CROSSINGS / (2 * cutoff)))
+        self.offsets = np.arange(-self.half + 1, self.half + 1)
+        self.bank = self._build_bank()
+        
+        # Frames not yet consumed, starting at global input frame buffer_start;
+        # zero padding in front so the first outputs have left context
+        self.buffer = np.zeros((self.half - 1, channels), dtype=np.float32)
+        self.buffer_start = -(self.half - 1)
+        self.received = 0
+        self.next_out = 0
+    
+    def _build_bank(self):
+        """Return the (up, taps) weights for every fractional position"""
+        t = self.offsets[None, :] - np.arange(self.up)[:, None] / self.up
+        if self.mode == 'linear':
+            bank = np.maximum(0.0, 1.0 - np.abs(t))
+        else:
+            cutoff = 0.5 * min(1.0, self.out_rate / self.in_rate) * SINC_ROLLOFF
+            window = np.i0(SINC_KAISER_BETA * np.sqrt(np.clip(1 - (t / self.half) ** 2, 0, 1)))
+            bank = 2 * cutoff * np.sinc(2 * cutoff * t) * window / np.i0(SINC_KAISER_BETA)
+            # Unity gain at DC for every phase
+            bank /= bank.sum(axis=1, keepdims=True)
+        return bank.astype(np.float32)
+    
+    def process(self, samples):
+        """Resample one block of interleaved int16 samples"""
+        if self.in_rate == self.out_rate:
+            return samples
+        frames = samples.reshape(-1, self.channels).astype(np.float32)
+        self.buffer = np.concatenate([self.buffer, frames])
+        self.received += len(frames)
+        
+        # Output k is ready once its last tap (k * down // up + half) has arrived
+        buffer_end = self.buffer_start + len(self.buffer)
+        end = -(-(buffer_end - self.half) * self.up // self.down)
+        return self._produce(end)
+    
+    def flush(self):
+        """Return the remaining output after the last block"""
+        if self.in_rate == self.out_rate:
+            return np.empty(0, dtype=np.int16)
+        # Pad with silence so the final outputs have right context
+        self.buffer = np.concatenate([self.buffer, np.zeros((self.half, self.channels), dtype=np.float32)])
+        end = -(-self.received * self.up // self.down)
+        return self._produce(end)
+    
+    def output_frames(self, frames):
+        """Number of frames the conversion of frames input frames produces"""
+        if self.in_rate == self.out_rate:
+            return frames
+        return -(-frames * self.up // self.down)
+    
+    def _produce(self, end):
+        """Compute output frames next_out..end and drop input no longer needed"""
+        out = np.empty((max(0, end - self.next_out), self.channels), dtype=np.float32)
+        buffer = np.ascontiguousarray(self.buffer)
+        item = buffer.itemsize
+        
+        # Outputs k = m * up + r share the same phase for a given r, and their
+        # inputs are evenly spaced by down frames, so each residue r is a
+        # strided (rows, taps, channels) view multiplied by one weight vector
+        for r in range(self.up):
+            m_start = -(-(self.next_out - r) // self.up)
+            m_end = -(-(end - r) // self.up)
+            if m_end <= m_start:
+                continue
+            first = m_start * self.down + r * self.down // self.up + self.offsets[0] - self.buffer_start
+            taps = as_strided(buffer[first:], shape=(m_end - m_start, len(self.offsets), self.channels),
+                              strides=(self.down * self.channels * item, self.channels * item, item),
+                              writeable=False)
+            weights = self.bank[r * self.down % self.up]
+            out[m_start * self.up + r - self.next_out::self.up] = taps.transpose(0, 2, 1) @ weights
+        self.next_out = max(self.next_out, end)
+        
+        # Keep only the frames the next output still needs
+        keep_from = self.next_out * self.down // self.up - (self.half - 1)
+        drop = min(max(0, keep_from - self.buffer_start), len(self.buffer))
+        self.buffer = self.buffer[drop:]
+        self.buffer_start += drop
+        
+        np.rint(out, out=out)
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16).reshape(-1)
+
+
+def make_resampler(mode, channels, in_rate, out_rate):
+    """Create the block sample rate converter for one of RESAMPLERS"""
+    if mode == 'audioop':
+        return RateConverter(channels, in_rate, out_rate)
+    return Resampler(channels, in_rate, out_rate, mode)
+
+
+def _resample_audio(audio, sample_rate, resampler='linear'):
+    """Return a 16-bit copy of an AudioSegment at sample_rate"""
+    audio = audio.set_sample_width(2)
+    if resampler == 'audioop' or audio.frame_rate == sample_rate:
+        return audio.set_frame_rate(sample_rate)
+    
+    converter = make_resampler(resampler, audio.channels, audio.frame_rate, sample_rate)
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    # Fed in large blocks so the converter never holds a float copy of the whole track
+    step = 16 * DEFAULT_BLOCK_FRAMES * audio.channels
+    parts = [converter.process(samples[i:i + step]) for i in range(0, len(samples), step)]
+    parts.append(converter.flush())
+    resampled = np.concatenate(parts)
+    return AudioSegment(
+        resampled.tobytes(),
+        frame_rate=sample_rate,
+        sample_width=2,
+        channels=audio.channels
+    )
+
+
+class WavBlockWriter:
+    """Writes sample blocks to a WAV file as they are produced"""
+    
+    def __init__(self, output_file, channels, frame_rate, sample_width):
+        self.sample_width = sample_width
+        self.wav = wave.open(output_file, 'wb')
+        self.wav.setnchannels(channels)
+        self.wav.setsampwidth(sample_width)
+        self.wav.setframerate(frame_rate)
+    
+    def write(self, data):
+        if self.sample_width == 1:
+            # Convert to unsigned integers for wav
+            data = audioop.bias(data, 1, 128)
+        self.wav.writeframesraw(data)
+    
+    def close(self):
+        # wave patches the header with the final frame count on close
+        self.wav.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _output_samples(source, converter, mode, settings):
+    """
+    Samples the whole track has after resampling, as the in-memory
+    converters see it. Only the chiptune arpeggio depends on it, so only
+    then is a compressed source decoded once more to count its frames.
+    """
+    if mode == 'chiptune' and settings['arpeggio_effect'] > 0:
+        source.count_frames()
+    return converter.output_frames(source.total_frames) * source.channels
+
+
+class BlockEffect:
+    """
+    Runs the effect chain of a conversion mode on consecutive blocks.
+    
+    Produces exactly the same stages as the convert_* functions; the
+    position inside the track is carried across blocks.
+    """
+    
+    def __init__(self, mode, settings, total_samples):
+        self.mode = mode
+        self.settings = settings
+        self.total_samples = total_samples
+        self.position = 0
+        if mode == 'enhanced':
+            # Built once so its buffers are reused for every block
+            self.chain = enhanced_chain(settings['bit_depth'], settings['square_wave_effect'],
+                                        settings['quantize_factor'], settings['distortion'],
+                                        settings['seed'])
+        if mode == 'simple':
+            self.sample_width = settings['bit_depth'] // 8
+        else:
+            self.sample_width = 2
+    
+    def process(self, samples):
+        """Process one block of int16 samples and return the bytes to write"""
+        bit_depth = self.settings['bit_depth']
+        if self.mode == 'simple':
+            data = audioop.lin2lin(samples.tobytes(), 2, self.sample_width)
+            samples = np.frombuffer(data, dtype=np.int8 if self.sample_width == 1 else np.int16)
+            data = _simple_effects(samples, bit_depth).tobytes()
+        elif self.mode == 'enhanced':
+            samples = self.chain.process(samples)
+            data = audioop.mul(samples.tobytes(), 2, db_to_float(ENHANCED_GAIN_DB))
+        else:
+            samples = _chiptune_effects(samples, bit_depth,
+                                        self.settings['arpeggio_effect'],
+                                        offset=self.position, total=self.total_samples)
+            data = samples.tobytes()
+        self.position += len(samples)
+        return data
+
+
+def convert_streaming(input_file, output_file=None, mode='enhanced',
+                      block_frames=DEFAULT_BLOCK_FRAMES, **params):
+    """
+    Convert audio block by block so peak memory stays constant no matter
+    how long the input is.
+    
+    Parameters:
+    - input_file: Path to input audio file
+    - output_file: Path to output audio file (without extension)
+    - mode: 'simple', 'enhanced' or 'chiptune'
+    - block_frames: Number of frames decoded and processed per block
+    - params: Same effect parameters as the matching convert_* function
+    
+    Returns the path of the written WAV file.
+    """
+    settings = _mode_settings(mode, params)
+    sample_rate = settings['sample_rate']
+    
+    source = SourceStream(input_file, block_frames)
+    converter = make_resampler(settings['resampler'], source.channels, source.frame_rate, sample_rate)
+    
+    # Length after resampling, used to spread the arpeggio over the track
+    effect = BlockEffect(mode, settings, _output_samples(source, converter, mode, settings))
+    
+    output_file = _output_path(input_file, output_file, mode)
+    with WavBlockWriter(output_file, source.channels, sample_rate, effect.sample_width) as writer:
+        for block in source:
+            writer.write(effect.process(converter.process(block)))
+        writer.write(effect.process(converter.flush()))
+    
+    print(f"Streaming {mode} version saved as: {output_file}")
+    return output_file
+
+
+# In-memory converter for each mode
+CONVERTERS = {
+    'simple': convert_to_8bit_simple,
+    'enhanced': convert_to_8bit,
+    'chiptune': convert_to_chiptune,
+}
+
+
+class ConversionCache:
+    """
+    On-disk cache of rendered WAV files.
+    
+    Entries are keyed by the SHA-256 of the input file contents, the mode
+    and the full parameter set, so a hit never needs to decode the input.
+    Once the cache grows past max_bytes the least recently used entries
+    are deleted.
+    """
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def file_hash(input_file):
+        """Return the SHA-256 hex digest of a file's contents"""
+        digest = hashlib.sha256()
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def key(self, input_file, mode, settings, file_hash=None):
+        """Build the cache key of a conversion (pass file_hash to avoid re-hashing)"""
+        if file_hash is None:
+            file_hash = self.file_hash(input_file)
+        params = json.dumps({'version': CACHE_VERSION, 'mode': mode, 'settings': settings},
+                            sort_keys=True)
+        return hashlib.sha256(f"{file_hash}:{params}".encode()).hexdigest()
+    
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+    
+    def fetch(self, key, output_file):
+        """Copy a cached render to output_file, returning False on a miss"""
+        entry = self._entry_path(key)
+        try:
+            shutil.copyfile(entry, output_file)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def store(self, key, output_file):
+        """Add a rendered file to the cache and evict old entries if needed"""
+        entry = self._entry_path(key)
+        temp = f"{entry}.{os.getpid()}.tmp"
+        shutil.copyfile(output_file, temp)
+        # Atomic, so parallel batch workers never see a half-written entry
+        os.replace(temp, entry)
+        self.evict()
+    
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in glob.glob(os.path.join(self.cache_dir, '*.wav')):
+            try:
+                stat = os.stat(entry)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def convert_cached(input_file, output_file=None, mode='enhanced', cache=None,
+                   stream=False, block_frames=DEFAULT_BLOCK_FRAMES, **params):
+    """
+    Convert a file, reusing a cached render when the input and parameters match.
+    
+    Parameters:
+    - input_file: Path to input audio file
+    - output_file: Path to output audio file (without extension)
+    - mode: 'simple', 'enhanced' or 'chiptune'
+    - cache: ConversionCache to use, or None to always convert
+    - stream: Use convert_streaming instead of the in-memory converter
+    - block_frames: Block size when stream is True
+    - params: Same effect parameters as the matching convert_* function
+    
+    Returns the path of the written WAV file.
+    """
+    settings = _mode_settings(mode, params)
+    output_file = _output_path(input_file, output_file, mode)
+    
+    if cache is not None:
+        key = cache.key(input_file, mode, settings)
+        if cache.fetch(key, output_file):
+            print(f"Cached {mode} version restored as: {output_file}")
+            return output_file
+    
+    if stream:
+        convert_streaming(input_file, output_file, mode=mode, block_frames=block_frames, **settings)
+    else:
+        CONVERTERS[mode](input_file, output_file, **settings)
+    
+    if cache is not None:
+        cache.store(key, output_file)
+    return output_file
+
+
+def _render_presets(input_file, presets, output_dir=None,
+                    block_frames=DEFAULT_BLOCK_FRAMES, cache=None):
+    """Implementation of render_presets, also returning the number of cache hits"""
+    input_path = Path(input_file)
+    target_dir = Path(output_dir) if output_dir else input_path.parent
+    file_hash = cache.file_hash(input_file) if cache else None
+    
+    outputs = []
+    pending = []
+    hits = 0
+    for preset in presets:
+        params = dict(preset)
+        mode = params.pop('mode')
+        output_file = params.pop('output', None)
+        settings = _mode_settings(mode, params)
+        if output_file is None:
+            output_file = target_dir / f"{input_path.stem}{MODE_SUFFIXES[mode]}.wav"
+        output_file = _output_path(input_file, str(output_file), mode)
+        if output_file in outputs:
+            raise ValueError(f"Two presets write to {output_file}; give them different 'output' names")
+        outputs.append(output_file)
+        
+        key = None
+        if cache:
+            key = cache.key(input_file, mode, settings, file_hash)
+            if cache.fetch(key, output_file):
+                print(f"Cached {mode} version restored as: {output_file}")
+                hits += 1
+                continue
+        pending.append((mode, settings, output_file, key))
+    
+    if not pending:
+        # Everything came from the cache, no need to decode
+        return outputs, hits
+    
+    source = SourceStream(input_file, block_frames)
+    
+    # One converter per distinct sample rate (and resampler), shared by the presets using it
+    converters = {}
+    renders = []
+    for mode, settings, output_file, key in pending:
+        sample_rate = settings['sample_rate']
+        rate_key = (sample_rate, settings['resampler'])
+        if rate_key not in converters:
+            converters[rate_key] = make_resampler(settings['resampler'], source.channels,
+                                                  source.frame_rate, sample_rate)
+        effect = BlockEffect(mode, settings, _output_samples(source, converters[rate_key], mode, settings))
+        writer = WavBlockWriter(output_file, source.channels, sample_rate, effect.sample_width)
+        renders.append((rate_key, effect, writer))
+    
+    try:
+        for block in source:
+            resampled = {rate_key: converter.process(block) for rate_key, converter in converters.items()}
+            for rate_key, effect, writer in renders:
+                writer.write(effect.process(resampled[rate_key]))
+        
+        tails = {rate_key: converter.flush() for rate_key, converter in converters.items()}
+        for rate_key, effect, writer in renders:
+            writer.write(effect.process(tails[rate_key]))
+    finally:
+        for _, _, writer in renders:
+            writer.close()
+    
+    for mode, settings, output_file, key in pending:
+        print(f"{mode.capitalize()} version saved as: {output_file}")
+        if cache:
+            cache.store(key, output_file)
+    return outputs, hits
+
+
+def render_presets(input_file, presets, output_dir=None,
+                   block_frames=DEFAULT_BLOCK_FRAMES, cache=None):
+    """
+    Decode a track once and render several presets from it in a single pass.
+    
+    The source is read block by block; each block is resampled once per
+    distinct sample_rate (and resampler) and fed to every preset using that
+    rate, so the input is decoded and resampled only once whatever the
+    number of presets.
+    
+    Parameters:
+    - input_file: Path to input audio file
+    - presets: List of dicts with a 'mode' key, the mode's parameters
+      (missing ones take the mode defaults) and an optional 'output' path
+    - output_dir: Directory for presets without 'output' (defaults to next to the input)
+    - block_frames: Number of frames decoded and processed per block
+    - cache: ConversionCache to use, or None to always render
+    
+    Example:
+        render_presets('holy-pipes.mp3', [
+            {'mode': 'simple'},
+            {'mode': 'enhanced', 'sample_rate': 6000, 'bit_depth': 6},
+            {'mode': 'chiptune', 'arpeggio_effect': 0.3},
+        ])
+    
+    Returns the list of written WAV files, in the order of presets.
+    """
+    outputs, _ = _render_presets(input_file, presets, output_dir, block_frames, cache)
+    return outputs
+
+
+def _wav_duration(path):
+    """Return the duration in seconds of a WAV file from its header"""
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _glob_root(pattern):
+    """The leading folders of a glob pattern, before the first wildcard"""
+    parts = Path(pattern).parts
+    static = []
+    for part in parts[:-1]:
+        if glob.has_magic(part):
+            break
+        static.append(part)
+    return Path(*static) if static else Path('.')
+
+
+def collect_input_files(inputs):
+    """
+    Expand files, directories and glob patterns into the audio files to convert.
+    
+    Directories are searched recursively. Files produced by a previous batch
+    run (names ending in a mode suffix) are skipped. Returns a dict sorted by
+    path, mapping each file to its folder relative to the input it was found
+    under ('' for files given directly), so an output folder can mirror the
+    input tree.
+    """
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            root = Path(item)
+            candidates = glob.glob(os.path.join(item, '**', '*'), recursive=True)
+        elif os.path.isfile(item):
+            root = Path(item).parent
+            candidates = [item]
+        else:
+            root = _glob_root(item)
+            candidates = glob.glob(item, recursive=True)
+        for candidate in candidates:
+            path = Path(candidate)
+            if not path.is_file() or path.suffix.lower() not in AUDIO_EXTENSIONS:
+                continue
+            if any(path.stem.endswith(suffix) for suffix in MODE_SUFFIXES.values()):
+                continue
+            found.setdefault(str(path), os.path.relpath(path.parent, root))
+    return {path: ('' if folder == '.' else folder) for path, folder in sorted(found.items())}
+
+
+def _batch_output_dirs(files, output_dir):
+    """
+    Output folder of every file of collect_input_files(): the input tree
+    mirrored under output_dir, or next to each input. Raises ValueError if
+    two inputs would write the same output (e.g. song.mp3 and song.ogg).
+    """
+    folders = {}
+    owners = {}
+    for input_file, folder in files.items():
+        target = Path(output_dir, folder) if output_dir else Path(input_file).parent
+        stem = (target / Path(input_file).stem).resolve()
+        if stem in owners:
+            raise ValueError(f"{owners[stem]} and {input_file} would write the same output "
+                             f"files ({stem}_*.wav); rename one of them")
+        owners[stem] = input_file
+        folders[input_file] = str(target)
+    return folders
+
+
+def _batch_convert_file(input_file, modes, output_dir=None, cache=None, resampler='linear'):
+    """
+    Render every requested mode of input_file with its default preset.
+    
+    Runs inside the worker processes of convert_batch. Returns the input
+    file, the written outputs, the number of cache hits, the elapsed time
+    and the audio duration.
+    """
+    start = time.perf_counter()
+    presets = [{'mode': mode, 'resampler': resampler} for mode in modes]
+    outputs, hits = _render_presets(input_file, presets, output_dir, cache=cache)
+    return input_file, outputs, hits, time.perf_counter() - start, _wav_duration(outputs[0])
+
+
+def convert_batch(inputs, modes=('enhanced',), workers=None, output_dir=None, cache=None,
+                  resampler='linear'):
+    """
+    Convert many files in parallel over a process pool.
+    
+    Parameters:
+    - inputs: Files, directories or glob patterns
+    - modes: Conversion modes to render for every file (decoded once per file)
+    - workers: Number of worker processes (defaults to the number of CPUs)
+    - output_dir: Directory for the results, mirroring the folders of the
+      inputs (defaults to next to each input)
+    - cache: ConversionCache to use, or None to always convert
+    - resampler: Sample rate converter, one of RESAMPLERS
+    
+    Returns the number of files that failed (all of them if two inputs
+    would write the same output, nothing is converted then).
+    """
+    files = collect_input_files(inputs)
+    if not files:
+        print("No audio files found.")
+        return 0
+    try:
+        folders = _batch_output_dirs(files, output_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return len(files)
+    for folder in set(folders.values()):
+        os.makedirs(folder, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    
+    print(f"Converting {len(files)} files ({', '.join(modes)}) with {workers} workers")
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    failures = 0
+    cache_hits = 0
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_batch_convert_file, f, list(modes), folders[f], cache, resampler): f
+                   for f in files}
+        for done, future in enumerate(as_completed(futures), 1):
+            input_file = futures[future]
+            try:
+                _, outputs, hits, elapsed, duration = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(files)}] {input_file}: FAILED ({e})")
+                continue
+            audio_seconds += duration
+            cache_hits += hits
+            print(f"[{done}/{len(files)}] {input_file}: {elapsed:.2f}s "
+                  f"({duration:.1f}s of audio, {len(outputs)} outputs, {hits} cached)")
+    
+    wall = time.perf_counter() - start
+    converted = len(files) - failures
+    print(f"\nConverted {converted}/{len(files)} files in {wall:.2f}s "
+          f"({cache_hits}/{converted * len(modes)} outputs from cache)")
+    if wall > 0:
+        print(f"Throughput: {converted / wall:.2f} files/s, "
+              f"{audio_seconds / wall:.1f}x realtime "
+              f"({audio_seconds * len(modes) / wall:.1f}x counting every mode)")
+    return failures
+
+
+def _add_cache_arguments(parser):
+    """Add the conversion cache options to a parser"""
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar ni actualizar la caché de conversiones')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Carpeta de la caché (por defecto: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f'Tamaño máximo de la caché en MB (por defecto: {DEFAULT_CACHE_SIZE_MB})')
+
+
+def _add_resampler_argument(parser):
+    """Add the sample rate converter option to a parser"""
+    parser.add_argument('-r', '--resampler', choices=RESAMPLERS, default='linear',
+                        help='Conversor de tasa de muestreo: linear (rápido), sinc (sin aliasing) '
+                             'o audioop (el de pydub) (por defecto: linear)')
+
+
+def _cache_from_arguments(args):
+    """Build the ConversionCache selected on the command line, or None"""
+    if args.no_cache:
+        return None
+    return ConversionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+
+def parse_batch_arguments(argv):
+    """Parse command line arguments of the batch subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='song_processing.py batch',
+        description='Convierte carpetas enteras en paralelo usando todos los núcleos',
+        epilog='''
+Examples:
+  python song_processing.py batch musica/                          # Modo enhanced, todos los núcleos
+  python song_processing.py batch musica/ -m simple enhanced chiptune -j 4
+  python song_processing.py batch "musica/**/*.mp3" -O salida/     # Glob y carpeta de salida
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    
+    parser.add_argument('inputs', nargs='+', help='Archivos, carpetas o patrones glob')
+    parser.add_argument('-m', '--modes', nargs='+', choices=list(MODE_DEFAULTS),
+                        default=['enhanced'], help='Modos a generar por cada archivo (por defecto: enhanced)')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='Número de procesos (por defecto: número de núcleos)')
+    parser.add_argument('-O', '--output-dir',
+                        help='Carpeta de salida, con las mismas subcarpetas que la entrada '
+                             '(por defecto: junto a cada archivo)')
+    _add_resampler_argument(parser)
+    _add_cache_arguments(parser)
+    
+    return parser.parse_args(argv)
+
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(
@@ -187,6 +1202,10 @@ Examples:
   python song_processing.py mi_cancion.mp3 -m chiptune        # Modo chiptune
   python song_processing.py mi_cancion.mp3 -o nombre_salida   # Especificar nombre de salida
   python song_processing.py mi_cancion.mp3 -sr 6000 -bd 6     # Ajustar parámetros específicos
+  python song_processing.py pista_larga.mp3 --stream          # Procesar por bloques (memoria constante)
+  python song_processing.py batch musica/ -m simple chiptune   # Procesar carpetas en paralelo
+  python song_processing.py mi_cancion.mp3 --no-cache         # Ignorar la caché de conversiones
+  python song_processing.py mi_cancion.mp3 -r sinc            # Remuestreo de alta calidad
         ''',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
@@ -205,8 +1224,16 @@ Examples:
                         help='Factor de cuantización (0-1)')
     parser.add_argument('-d', '--distortion', type=float, 
                         help='Cantidad de distorsión (0-1)')
+    parser.add_argument('--seed', type=int,
+                        help='Semilla del ruido de distorsión (resultado reproducible)')
     parser.add_argument('-a', '--arpeggio', type=float, 
                         help='Efecto de arpegio para chiptune (0-1)')
+    _add_resampler_argument(parser)
+    parser.add_argument('--stream', action='store_true',
+                        help='Procesar por bloques sin cargar la pista entera en memoria')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_FRAMES,
+                        help=f'Frames por bloque en modo --stream (por defecto: {DEFAULT_BLOCK_FRAMES})')
+    _add_cache_arguments(parser)
     
     return parser.parse_args()
 
@@ -224,25 +1251,34 @@ if __name__ == "__main__":
             print("Run with --help for more information")
             sys.exit(1)
         else:
-            # Original simple algorithm
-            convert_to_8bit_simple(input_file)
-            
-            # Enhanced 8-bit version (more extreme effects)
-            convert_to_8bit(
-                input_file, 
-                sample_rate=6000,
-                bit_depth=6,
-                square_wave_effect=0.5,
-                quantize_factor=0.9,
-                distortion=0.3
-            )
-            
-            # Chiptune version (NES/GameBoy style)
-            convert_to_chiptune(
-                input_file, 
-                sample_rate=11025,
-                arpeggio_effect=0.3
-            )
+            # All three versions are rendered from a single decode
+            render_presets(input_file, [
+                # Original simple algorithm
+                {'mode': 'simple'},
+                
+                # Enhanced 8-bit version (more extreme effects)
+                {
+                    'mode': 'enhanced',
+                    'sample_rate': 6000,
+                    'bit_depth': 6,
+                    'square_wave_effect': 0.5,
+                    'quantize_factor': 0.9,
+                    'distortion': 0.3,
+                },
+                
+                # Chiptune version (NES/GameBoy style)
+                {
+                    'mode': 'chiptune',
+                    'sample_rate': 11025,
+                    'arpeggio_effect': 0.3,
+                },
+            ], cache=ConversionCache())
+    elif sys.argv[1] == 'batch':
+        # Conversión en lote de carpetas o patrones glob
+        args = parse_batch_arguments(sys.argv[2:])
+        failures = convert_batch(args.inputs, args.modes, args.workers, args.output_dir,
+                                 cache=_cache_from_arguments(args), resampler=args.resampler)
+        sys.exit(1 if failures else 0)
     else:
         # Procesar argumentos de línea de comandos
         args = parse_arguments()
@@ -259,8 +1295,6 @@ if __name__ == "__main__":
                 kwargs['sample_rate'] = args.sample_rate
             if args.bit_depth:
                 kwargs['bit_depth'] = args.bit_depth
-                
-            convert_to_8bit_simple(args.input_file, args.output, **kwargs)
             
         elif args.mode == 'enhanced':
             kwargs = {}
@@ -274,8 +1308,8 @@ if __name__ == "__main__":
                 kwargs['quantize_factor'] = args.quantize_factor
             if args.distortion is not None:
                 kwargs['distortion'] = args.distortion
-                
-            convert_to_8bit(args.input_file, args.output, **kwargs)
+            if args.seed is not None:
+                kwargs['seed'] = args.seed
             
         elif args.mode == 'chiptune':
             kwargs = {}
@@ -285,7 +1319,10 @@ if __name__ == "__main__":
                 kwargs['bit_depth'] = args.bit_depth
             if args.arpeggio is not None:
                 kwargs['arpeggio_effect'] = args.arpeggio
-                
-            convert_to_chiptune(args.input_file, args.output, **kwargs)
+        
+        kwargs['resampler'] = args.resampler
+        convert_cached(args.input_file, args.output, mode=args.mode,
+                       cache=_cache_from_arguments(args), stream=args.stream,
+                       block_frames=args.block_size, **kwargs)
             
         print("Conversion complete!")
\ No newline at end of file
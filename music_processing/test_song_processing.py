@@ -0,0 +1,116 @@
+"""
+Tests for song_processing. Run from the repository root or this folder:
+
+  python -m pytest music_processing
+"""
+import contextlib
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from benchmarks import (DISTORTION_TOLERANCE, _reference_enhanced_effects, chain_noise,
+                        synthetic_signal)
+from song_processing import (CONVERTERS, RESAMPLERS, convert_batch, convert_streaming,
+                             enhanced_chain, render_presets)
+
+
+SOURCE_RATE = 44100
+
+# Small blocks, so every conversion crosses many block boundaries
+BLOCK_FRAMES = 4096
+
+# Effect settings that make every mode deterministic
+MODE_PARAMS = {'simple': {}, 'enhanced': {'seed': 1}, 'chiptune': {}}
+
+
+# Enhanced chain settings compared with the float64 reference: (square_wave_effect, quantize_factor)
+CHAIN_SETTINGS = [(0.3, 0.8), (0.0, 0.8), (0.3, 0.0), (0.1, 0.0), (1.0, 0.5), (0.6, 0.95)]
+
+
+def _write_wav(path, samples, channels, frame_rate=SOURCE_RATE):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        wav.writeframes(samples.tobytes())
+
+
+def _read_wav(path):
+    with wave.open(str(path), 'rb') as wav:
+        return wav.getparams(), wav.readframes(wav.getnframes())
+
+
+@pytest.mark.parametrize('mode', sorted(CONVERTERS))
+@pytest.mark.parametrize('resampler', RESAMPLERS)
+@pytest.mark.parametrize('frames', [SOURCE_RATE * 2, SOURCE_RATE * 2 + 1, SOURCE_RATE * 2 + 3])
+@pytest.mark.parametrize('channels', [1, 2])
+def test_streaming_matches_in_memory(tmp_path, mode, resampler, frames, channels):
+    """Streaming and single-pass preset renders are bit-identical to the in-memory converters"""
+    source = tmp_path / 'input.wav'
+    _write_wav(source, synthetic_signal(frames / SOURCE_RATE + 1, channels)[:frames * channels], channels)
+    params = dict(MODE_PARAMS[mode], resampler=resampler)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        CONVERTERS[mode](str(source), str(tmp_path / 'memory'), **params)
+        convert_streaming(str(source), str(tmp_path / 'stream'), mode=mode,
+                          block_frames=BLOCK_FRAMES, **params)
+        render_presets(str(source), [dict(params, mode=mode, output=str(tmp_path / 'preset'))],
+                       block_frames=BLOCK_FRAMES)
+
+    expected = _read_wav(tmp_path / 'memory.wav')
+    assert _read_wav(tmp_path / 'stream.wav') == expected
+    assert _read_wav(tmp_path / 'preset.wav') == expected
+
+
+def test_batch_mirrors_input_folders(tmp_path):
+    """Files with the same name in different folders get different outputs under --output-dir"""
+    for folder in ('a', 'b/c'):
+        (tmp_path / 'in' / folder).mkdir(parents=True)
+        _write_wav(tmp_path / 'in' / folder / 'intro.wav', synthetic_signal(0.5, 1), 1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        failures = convert_batch([str(tmp_path / 'in')], ['chiptune'], workers=1,
+                                 output_dir=str(tmp_path / 'out'))
+    assert failures == 0
+    assert (tmp_path / 'out' / 'a' / 'intro_chiptune.wav').exists()
+    assert (tmp_path / 'out' / 'b' / 'c' / 'intro_chiptune.wav').exists()
+
+
+def test_batch_rejects_colliding_outputs(tmp_path):
+    """Two inputs writing the same output fail before anything is converted"""
+    for name in ('intro.wav', 'intro.aiff'):
+        _write_wav(tmp_path / name, synthetic_signal(0.5, 1), 1)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        failures = convert_batch([str(tmp_path)], ['chiptune'], workers=1, output_dir=str(tmp_path / 'out'))
+    assert failures == 2
+    assert 'would write the same output' in output.getvalue()
+    assert not (tmp_path / 'out').exists()
+
+
+@pytest.mark.parametrize('bit_depth', [8, 16])
+@pytest.mark.parametrize('channels', [1, 2])
+@pytest.mark.parametrize('square_wave_effect, quantize_factor', CHAIN_SETTINGS)
+@pytest.mark.parametrize('seed', [0, 7])
+def test_enhanced_chain_matches_float64(bit_depth, channels, square_wave_effect, quantize_factor, seed):
+    """
+    The float32 EffectChain gives exactly the float64 result without
+    distortion. With distortion both get the same noise, so they can only
+    differ by the float32 rounding of the scaled sample: DISTORTION_TOLERANCE (1 LSB).
+    """
+    samples = synthetic_signal(2, channels, seed=seed)
+
+    chain = enhanced_chain(bit_depth, square_wave_effect, quantize_factor, 0)
+    expected = _reference_enhanced_effects(samples, bit_depth, square_wave_effect, quantize_factor, 0)
+    np.testing.assert_array_equal(chain.process(samples), expected)
+
+    distortion = 0.2
+    chain = enhanced_chain(bit_depth, square_wave_effect, quantize_factor, distortion, seed)
+    actual = chain.process(samples)
+    expected = _reference_enhanced_effects(samples, bit_depth, square_wave_effect, quantize_factor,
+                                           distortion, chain_noise(len(samples), seed))
+    assert actual.dtype == np.int16
+    assert np.abs(actual.astype(np.int32) - expected).max() <= DISTORTION_TOLERANCE
@@ -0,0 +1,139 @@
+import csv
+import json
+import time
+
+import numpy as np
+import pygame
+
+# Phases of Game.run, in the order they are marked
+PHASES = ('events', 'update', 'render', 'overlay', 'wait', 'flip')
+EVENTS, UPDATE, RENDER, OVERLAY, WAIT, FLIP = range(len(PHASES))
+
+# Frames kept in the ring buffer (10 s at 60 FPS)
+DEFAULT_CAPACITY = 600
+
+# Frame budget drawn as a reference line on the graph
+TARGET_FRAME_MS = 1000 / 60
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    """
+    Records how long each phase of the main loop takes.
+
+    Durations go to a fixed size ring buffer (frames x phases, in ms), so
+    recording never allocates. Call start_frame() once the frame's events
+    are in (not before waiting for them, idle time is not frame time) and
+    mark(phase) at the end of each phase. The F3 overlay shows a frame time
+    graph and the p50/p95/p99 of each phase; dump() writes the buffer as
+    CSV or JSON depending on the file extension.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, output=None, show_overlay=False):
+        self.capacity = capacity
+        self.output = output
+        self.show_overlay = show_overlay
+
+        self.samples = np.zeros((capacity, len(PHASES)), dtype=np.float64)
+        self.frames = 0  # Frames recorded so far, the next row is frames % capacity
+        self._row = self.samples[0]
+        self._last = 0.0
+
+        # Overlay, created on first use. The stats text is refreshed a few times per second
+        self._font = None
+        self._panel = None
+        self._stats_lines = []
+        self._stats_frame = -1
+
+    def start_frame(self):
+        self._row = self.samples[self.frames % self.capacity]
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Record the time since the previous mark as the duration of a phase (index into PHASES)"""
+        now = time.perf_counter()
+        self._row[phase] = (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self):
+        self.frames += 1
+
+    def history(self):
+        """Recorded frames in chronological order, oldest first"""
+        if self.frames < self.capacity:
+            return self.samples[:self.frames]
+        start = self.frames % self.capacity
+        return np.concatenate((self.samples[start:], self.samples[:start]))
+
+    def stats(self):
+        """Return {phase: {p50, p95, p99, max}} in ms, including the whole frame as 'frame'"""
+        history = self.history()
+        if not len(history):
+            return {}
+        columns = dict(zip(PHASES, history.T))
+        columns['frame'] = history.sum(axis=1)
+        stats = {}
+        for phase, values in columns.items():
+            stats[phase] = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+            stats[phase]['max'] = float(values.max())
+        return stats
+
+    def dump(self, path=None):
+        """Write the recorded frames to a .csv or .json file"""
+        path = path or self.output
+        if not path:
+            return
+        history = self.history()
+        first_frame = self.frames - len(history)
+
+        if path.endswith('.json'):
+            trace = {
+                'phases': list(PHASES),
+                'frames': self.frames,
+                'stats': self.stats(),
+                'samples_ms': [[round(v, 4) for v in row] for row in history.tolist()],
+            }
+            with open(path, 'w') as f:
+                json.dump(trace, f, indent=2)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('frame',) + PHASES + ('total',))
+                for i, row in enumerate(history.tolist()):
+                    writer.writerow([first_frame + i] + [f"{v:.4f}" for v in row] + [f"{sum(row):.4f}"])
+        print(f"Frame trace saved as: {path}")
+
+    def draw_overlay(self, screen, graph_frames=360):
+        """Draw the frame time graph and percentile stats in the top left corner, returning its rect"""
+        if self._font is None:
+            self._font = pygame.font.Font(None, 18)
+            self._panel = pygame.Surface((graph_frames, 60 + 14 * (len(PHASES) + 2)))
+            self._panel.set_alpha(190)
+
+        # Percentiles over the whole buffer are not free, refresh them twice a second
+        if self.frames - self._stats_frame >= 30:
+            self._stats_frame = self.frames
+            self._stats_lines = [
+                self._font.render(f"{phase:<8} p50 {s['p50']:5.2f}  p95 {s['p95']:5.2f}  "
+                                  f"p99 {s['p99']:5.2f} ms", True, (220, 220, 220))
+                for phase, s in self.stats().items()
+            ]
+
+        panel = self._panel
+        panel.fill((0, 0, 0))
+
+        # Frame time graph, 0 to 2x the frame budget
+        graph_height = 60
+        scale = graph_height / (TARGET_FRAME_MS * 2)
+        totals = self.history()[-graph_frames:].sum(axis=1)
+        target_y = graph_height - int(TARGET_FRAME_MS * scale)
+        pygame.draw.line(panel, (80, 80, 80), (0, target_y), (graph_frames, target_y))
+        if len(totals) > 1:
+            heights = graph_height - np.minimum(totals * scale, graph_height)
+            points = list(zip(range(len(totals)), heights.astype(int).tolist()))
+            pygame.draw.lines(panel, (0, 220, 120), False, points)
+
+        for i, line in enumerate(self._stats_lines):
+            panel.blit(line, (4, graph_height + 4 + i * 14))
+        return screen.blit(panel, (0, 0))
@@ -0,0 +1,163 @@
+"""
+Sprite atlas builder: packs PNG frames into a few large sheets.
+
+Every PNG under the input folder becomes a sprite named after its path
+without the extension ('enemies/bat_0.png' -> 'enemies/bat_0'). Sprites are
+packed in shelves (rows of decreasing height) into sheets of at most
+--max-size pixels, and the index written next to the sheets maps every name
+to its sheet and rectangle:
+
+  {"version": 1, "source_hash": "...", "sheets": ["atlas_0.png", ...],
+   "sprites": {"enemies/bat_0": [sheet, x, y, width, height], ...}}
+
+The game loads it with view/sprite_atlas.py. Nothing is rebuilt when the
+frames did not change since the last build (see source_hash).
+
+Examples:
+  python atlas_builder.py ../assets/sprites                   # -> ../assets/atlas/atlas.json
+  python atlas_builder.py frames/ -o out/ --max-size 1024
+  python atlas_builder.py ../assets/sprites --force
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Only image loading and saving is used, no window is opened
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+
+
+INDEX_VERSION = 1
+INDEX_NAME = 'atlas.json'
+SHEET_NAME = 'atlas_{}.png'
+
+DEFAULT_MAX_SIZE = 2048
+
+# Transparent pixels between sprites, so filtering never mixes neighbours
+PADDING = 1
+
+
+def find_frames(input_dir):
+    """Return {sprite name: path} for every PNG under input_dir, sorted by name"""
+    root = Path(input_dir)
+    frames = {path.relative_to(root).with_suffix('').as_posix(): path
+              for path in root.rglob('*.png')}
+    return dict(sorted(frames.items()))
+
+
+def source_hash(frames):
+    """Hash of the frame names and contents, to skip rebuilding an unchanged atlas"""
+    digest = hashlib.sha1(str(INDEX_VERSION).encode())
+    for name, path in frames.items():
+        digest.update(name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def pack(sizes, max_size=DEFAULT_MAX_SIZE, padding=PADDING):
+    """
+    Place rectangles in shelves. sizes is {name: (width, height)}; returns
+    {name: (sheet, x, y)} and the size each sheet needs.
+    """
+    # Tallest first, so every shelf wastes little height
+    order = sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name))
+    placements = {}
+    sheet_sizes = []
+    sheet = -1
+    x = y = shelf_height = 0
+    for name in order:
+        width, height = sizes[name]
+        # Padding goes on both sides of every sprite
+        if width + 2 * padding > max_size or height + 2 * padding > max_size:
+            raise ValueError(f"Sprite {name} ({width}x{height}) does not fit in a {max_size} sheet")
+        if sheet < 0 or x + width + 2 * padding > max_size:
+            # Next shelf, or a new sheet when there is no room for it
+            if sheet >= 0 and y + shelf_height + height + 2 * padding <= max_size:
+                y += shelf_height
+            else:
+                sheet += 1
+                sheet_sizes.append((0, 0))
+                y = 0
+            x = 0
+            shelf_height = 0
+        placements[name] = (sheet, x + padding, y + padding)
+        x += width + padding
+        shelf_height = max(shelf_height, height + padding)
+        used_width, used_height = sheet_sizes[sheet]
+        sheet_sizes[sheet] = (max(used_width, x + padding), max(used_height, y + shelf_height + padding))
+    return placements, sheet_sizes
+
+
+def build_atlas(input_dir, output_dir, max_size=DEFAULT_MAX_SIZE, force=False):
+    """Pack the frames of input_dir into sheets in output_dir, return the index (None if unchanged)"""
+    frames = find_frames(input_dir)
+    if not frames:
+        raise ValueError(f"No PNG frames found in {input_dir}")
+    output = Path(output_dir)
+    index_path = output / INDEX_NAME
+    digest = source_hash(frames)
+    if not force and index_path.exists():
+        with open(index_path) as f:
+            if json.load(f).get('source_hash') == digest:
+                return None
+
+    images = {name: pygame.image.load(str(path)) for name, path in frames.items()}
+    placements, sheet_sizes = pack({name: image.get_size() for name, image in images.items()}, max_size)
+
+    sheets = [pygame.Surface(size, pygame.SRCALPHA) for size in sheet_sizes]
+    for sheet in sheets:
+        sheet.fill((0, 0, 0, 0))
+    sprites = {}
+    for name, image in images.items():
+        sheet, x, y = placements[name]
+        sheets[sheet].blit(image, (x, y))
+        sprites[name] = [sheet, x, y, image.get_width(), image.get_height()]
+
+    output.mkdir(parents=True, exist_ok=True)
+    sheet_names = []
+    for i, sheet in enumerate(sheets):
+        sheet_names.append(SHEET_NAME.format(i))
+        pygame.image.save(sheet, str(output / sheet_names[-1]))
+    # Sheets left over from a bigger previous build
+    stale = len(sheets)
+    while (output / SHEET_NAME.format(stale)).exists():
+        (output / SHEET_NAME.format(stale)).unlink()
+        stale += 1
+
+    index = {'version': INDEX_VERSION, 'source_hash': digest, 'sheets': sheet_names, 'sprites': sprites}
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Empaquetar los fotogramas PNG en hojas de sprites con un índice')
+    parser.add_argument('input_dir', help='Carpeta con los fotogramas PNG (se buscan también en subcarpetas)')
+    parser.add_argument('-o', '--output-dir',
+                        help='Carpeta de salida de las hojas y el índice (por defecto: ../atlas junto a la entrada)')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE,
+                        help=f'Tamaño máximo de cada hoja en píxeles (por defecto: {DEFAULT_MAX_SIZE})')
+    parser.add_argument('--force', action='store_true',
+                        help='Reconstruir aunque los fotogramas no hayan cambiado')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.abspath(args.input_dir)), 'atlas')
+    start = time.perf_counter()
+    try:
+        index = build_atlas(args.input_dir, output_dir, args.max_size, args.force)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if index is None:
+        print(f"Atlas in {output_dir} is up to date")
+    else:
+        print(f"Packed {len(index['sprites'])} sprites into {len(index['sheets'])} sheets "
+              f"in {time.perf_counter() - start:.2f} s: {os.path.join(output_dir, INDEX_NAME)}")
@@ -0,0 +1,33 @@
+import pygame
+
+class Camera:
+    """
+    The part of the level shown on screen, in level pixels.
+
+    follow() centers it on a point without showing anything outside the
+    level (a level smaller than the screen is centered instead).
+    """
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+
+    def follow(self, x, y, view_size, world_size):
+        self.width, self.height = view_size
+        self.x = self._clamp(x - self.width / 2, self.width, world_size[0])
+        self.y = self._clamp(y - self.height / 2, self.height, world_size[1])
+
+    def _clamp(self, start, view, world):
+        if world <= view:
+            return -((view - world) // 2)
+        # Whole pixels, so the tiles do not shimmer while scrolling
+        return int(max(0, min(world - view, start)))
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def to_screen(self, x, y):
+        return int(x - self.x), int(y - self.y)
@@ -1,20 +1,39 @@
 import pygame
 import os
+import numpy as np
+from view.text_cache import TextCache
+from view.camera import Camera
+from view.tilemap_renderer import TilemapRenderer
+from view.sprite_atlas import SpriteAtlas
+
+# Enemies and items are drawn with the atlas sprites 'enemy_<kind>' and
+# 'item_<kind>' ('player' for the ball), or as shapes colored by kind without them
+ENEMY_COLORS = [(90, 200, 90), (200, 140, 40), (170, 70, 200), (230, 230, 230)]
+ENEMY_RADIUS = 12
+ITEM_COLORS = [(240, 210, 60), (60, 200, 230), (230, 90, 150)]
+ITEM_SIZE = 12
 
 class GameView:
-    def __init__(self, screen):
+    def __init__(self, screen, dirty_rects=False):
         self.screen = screen
         self.background_color = (0, 0, 0)  # Black background
-        pygame.font.init()
-        self.font = pygame.font.Font(None, 48)  # Default font, size 48
+        # Fonts are loaded once and rendered text is cached, so static text is
+        # only rasterized the first time it is drawn
+        self.text = TextCache()
+        self.font = self.text.get_font(48)  # Default font, size 48
         
-        # Load and process background image
+        # Load background image (converted to the display format for fast blits)
         bg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'sala_pasos_perdidos.jpg')
-        self.background_image = pygame.image.load(bg_path)
-        self.background_image = pygame.transform.scale(self.background_image, (self.screen.get_width(), self.screen.get_height()))
+        self.source_image = pygame.image.load(bg_path).convert()
         
-        # Create blurred version of background
-        self.blurred_background = self._create_blurred_surface(self.background_image)
+        # Backgrounds with their dark overlay already applied, built for the
+        # current screen size by _build_backgrounds
+        self.background_size = None
+        self.background_image = None
+        self.blurred_background = None
+        self.menu_background = None
+        self.game_background = None
+        self._build_backgrounds()
         
         # Store rectangles for mouse interaction
         self.menu_item_rects = []
@@ -22,6 +41,58 @@ class GameView:
         self.save_menu_item_rects = []
         self.slider_rects = []
         
+        # The menus and the game screen are described as a list of draw operations
+        # (kind, args..., bounds). In dirty rect mode only the areas whose
+        # operations changed since the last frame are redrawn
+        self.dirty_rects = dirty_rects
+        self.draw_ops = []
+        self.last_ops = []
+        self.last_frame = None  # (state, screen size) of the last full redraw
+        self.invalidated = []  # Areas drawn over by someone else, repainted next frame
+        
+        # The level is drawn from cached chunks, only those the camera sees
+        self.camera = Camera()
+        self.tilemap = TilemapRenderer()
+        
+        # Sprites come from the packed atlas sheets (empty if it was not built)
+        self.set_atlas(SpriteAtlas())
+        
+    def _build_backgrounds(self):
+        """Scale the background to the screen and pre-composite the overlays (once per size)"""
+        size = self.screen.get_size()
+        self.background_size = size
+        self.background_image = pygame.transform.scale(self.source_image, size)
+        
+        # Create blurred version of background
+        self.blurred_background = self._create_blurred_surface(self.background_image)
+        
+        # Menus: blurred background with a dark overlay, slightly more opaque for better contrast
+        self.menu_background = self._darken(self.blurred_background, 160)
+        
+        # Other states: sharp background, half transparent overlay
+        self.game_background = self._darken(self.background_image, 128)
+    
+    def _darken(self, surface, alpha):
+        """Return a copy of surface with a black overlay of the given alpha baked in"""
+        result = surface.copy()
+        overlay = pygame.Surface(surface.get_size())
+        overlay.fill((0, 0, 0))
+        overlay.set_alpha(alpha)
+        result.blit(overlay, (0, 0))
+        return result.convert()
+    
+    def set_atlas(self, atlas):
+        """Use the sprites of a SpriteAtlas, looked up once here instead of on every draw"""
+        self.atlas = atlas
+        self.player_sprite = atlas.get('player')
+        self.enemy_sprites = [atlas.get(f'enemy_{kind}') for kind in range(len(ENEMY_COLORS))]
+        self.item_sprites = [atlas.get(f'item_{kind}') for kind in range(len(ITEM_COLORS))]
+    
+    def _check_background_size(self):
+        # Rebuild the cached backgrounds if the window was resized
+        if self.screen.get_size() != self.background_size:
+            self._build_backgrounds()
+    
     def _create_blurred_surface(self, surface):
         # Create a smaller version of the image (downscale)
         scale_factor = 4  # Higher number = more blur
@@ -32,54 +103,135 @@ class GameView:
         return pygame.transform.scale(small_surface, 
                                     (surface.get_width(), surface.get_height()))
         
-    def render(self, model):
-        # Clear the screen
-        self.screen.fill(self.background_color)
+    def render(self, model, alpha=1.0):
+        """
+        Draw the current state. alpha (0-1) is how far the frame is between
+        the previous and the current simulation step, for interpolation.
+        
+        Returns the screen areas that changed, to present with
+        pygame.display.update(rects), or None when the whole screen was
+        redrawn (present it with pygame.display.flip).
+        """
+        self._check_background_size()
+        self.draw_ops = []
         
+        # No need to clear the screen, every state draws a full screen background
         if model.game_state == "MENU":
+            # Blurred background with the overlay that makes text more readable
+            background = self.menu_background
             self._render_menu(model)
         elif model.game_state == "SETTINGS":
+            background = self.menu_background
             self._render_settings(model)
         elif model.game_state == "SAVE_MENU":
+            background = self.menu_background
             self._render_save_menu(model)
         elif model.game_state == "GAME":
-            self._render_game(model)
+            background = None  # Black
+            self._render_game(model, alpha)
         else:
-            # Draw background
-            self.screen.blit(self.background_image, (0, 0))
-            
-            # Add a semi-transparent overlay to make text more readable
-            overlay = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(128)  # 128 is half transparent
-            self.screen.blit(overlay, (0, 0))
-            
-            # Render game elements
-            self._render_level(model.current_level)
-            if model.player:
-                self._render_player(model.player)
-            for enemy in model.enemies:
-                self._render_enemy(enemy)
-            for item in model.items:
-                self._render_item(item)
+            # Game elements over the background with its semi-transparent overlay
+            background = self.game_background
+            self._render_world(model, alpha)
+        
+        ops = self.draw_ops
+        frame = (model.game_state, self.background_size)
+        if not self.dirty_rects or frame != self.last_frame:
+            self._draw_background(background)
+            self._draw_ops(ops)
+            self.last_frame = frame
+            self.last_ops = ops
+            self.invalidated = []
+            return None
+        
+        # Operations that appeared or disappeared mark their area as dirty
+        changed = set(self.last_ops).symmetric_difference(ops)
+        dirty = self._merge_rects([pygame.Rect(op[-1]) for op in changed] + self.invalidated)
+        self.last_ops = ops
+        self.invalidated = []
+        
+        # Repaint each dirty area: background, then every operation touching it
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self._draw_background(background, rect)
+            self._draw_ops([op for op in ops if rect.colliderect(op[-1])])
+        self.screen.set_clip(None)
+        return dirty
+    
+    def invalidate(self, rect):
+        """Mark a screen area for repainting on the next frame (e.g. after drawing an overlay on it)"""
+        self.invalidated.append(pygame.Rect(rect))
+    
+    def _merge_rects(self, rects):
+        """Merge overlapping rectangles so no area is repainted twice"""
+        merged = []
+        for rect in rects:
+            i = rect.collidelist(merged)
+            while i >= 0:
+                rect = rect.union(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+    
+    def _draw_background(self, background, area=None):
+        if background is None:
+            self.screen.fill((0, 0, 0), area)
+        elif area is None:
+            self.screen.blit(background, (0, 0))
+        else:
+            self.screen.blit(background, area.topleft, area)
+    
+    def _draw_ops(self, ops):
+        """Draw operations in order, each run of consecutive blits (a layer) in one Surface.blits() call"""
+        batch = []
+        for op in ops:
+            kind = op[0]
+            if kind == 'blit':
+                batch.append((op[1], op[2]))
+            elif kind == 'chunk':
+                batch.append((self.tilemap.surface(op[1]), op[2]))
+            else:
+                if batch:
+                    self.screen.blits(batch, doreturn=False)
+                    batch = []
+                self._draw_op(op)
+        if batch:
+            self.screen.blits(batch, doreturn=False)
+    
+    def _draw_op(self, op):
+        kind = op[0]
+        if kind == 'blit':
+            self.screen.blit(op[1], op[2])
+        elif kind == 'rect':
+            pygame.draw.rect(self.screen, op[1], op[2])
+        elif kind == 'circle':
+            pygame.draw.circle(self.screen, op[1], op[2], op[3])
+        elif kind == 'chunk':
+            self.screen.blit(self.tilemap.surface(op[1]), op[2])
+    
+    def _blit(self, surface, rect):
+        """Queue a surface to be drawn at rect"""
+        bounds = (rect[0], rect[1], surface.get_width(), surface.get_height())
+        self.draw_ops.append(('blit', surface, (rect[0], rect[1]), bounds))
+    
+    def _draw_rect(self, color, rect):
+        """Queue a filled rectangle"""
+        rect = tuple(rect)
+        self.draw_ops.append(('rect', color, rect, rect))
+    
+    def _draw_circle(self, color, center, radius):
+        """Queue a filled circle"""
+        bounds = (center[0] - radius - 1, center[1] - radius - 1, radius * 2 + 3, radius * 2 + 3)
+        self.draw_ops.append(('circle', color, center, radius, bounds))
     
     def _render_menu(self, model):
         screen_width = self.screen.get_width()
         screen_height = self.screen.get_height()
         
-        # Draw blurred background
-        self.screen.blit(self.blurred_background, (0, 0))
-        
-        # Add a semi-transparent overlay to make text more readable
-        overlay = pygame.Surface((screen_width, screen_height))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(160)  # Slightly more opaque for better contrast
-        self.screen.blit(overlay, (0, 0))
-        
         # Title
-        title = self.font.render("Economato-Textil", True, (255, 255, 255))
+        title = self.text.render("Economato-Textil", (255, 255, 255))
         title_rect = title.get_rect(center=(screen_width // 2, screen_height // 4))
-        self.screen.blit(title, title_rect)
+        self._blit(title, title_rect)
         
         # Reset menu item rects
         self.menu_item_rects = []
@@ -94,9 +246,9 @@ class GameView:
             else:
                 color = (255, 255, 255)  # White for normal
                 
-            text = self.font.render(item, True, color)
+            text = self.text.render(item, color)
             rect = text.get_rect(center=(screen_width // 2, screen_height // 2 + i * 60))
-            self.screen.blit(text, rect)
+            self._blit(text, rect)
             
             # Store rectangle for mouse interaction
             self.menu_item_rects.append(rect)
@@ -105,19 +257,10 @@ class GameView:
         screen_width = self.screen.get_width()
         screen_height = self.screen.get_height()
         
-        # Draw blurred background
-        self.screen.blit(self.blurred_background, (0, 0))
-        
-        # Add overlay
-        overlay = pygame.Surface((screen_width, screen_height))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(160)
-        self.screen.blit(overlay, (0, 0))
-        
         # Title
-        title = self.font.render("Settings", True, (255, 255, 255))
+        title = self.text.render("Settings", (255, 255, 255))
         title_rect = title.get_rect(center=(screen_width // 2, screen_height // 4))
-        self.screen.blit(title, title_rect)
+        self._blit(title, title_rect)
         
         # Reset settings item rects and slider rects
         self.settings_item_rects = []
@@ -136,9 +279,9 @@ class GameView:
                 color = (255, 255, 255)  # White for normal
                 
             # Text
-            text = self.font.render(item, True, color)
+            text = self.text.render(item, color)
             text_rect = text.get_rect(midright=(screen_width // 2 - 20, y_pos))
-            self.screen.blit(text, text_rect)
+            self._blit(text, text_rect)
             
             # Store rectangle for mouse interaction
             self.settings_item_rects.append(text_rect)
@@ -162,18 +305,18 @@ class GameView:
                 slider_rect = (slider_x, slider_y, slider_width, slider_height)
                 self.slider_rects.append(slider_rect)
                 
-                pygame.draw.rect(self.screen, (100, 100, 100), slider_rect)
+                self._draw_rect((100, 100, 100), slider_rect)
                 
                 # Slider fill
                 fill_width = int(slider_width * (value / 100))
-                pygame.draw.rect(self.screen, (0, 150, 255),
-                               (slider_x, slider_y, fill_width, slider_height))
+                self._draw_rect((0, 150, 255),
+                                (slider_x, slider_y, fill_width, slider_height))
                 
                 # Slider handle
                 handle_x = slider_x + fill_width - 2
                 handle_height = 20
-                pygame.draw.rect(self.screen, (200, 200, 200),
-                               (handle_x, y_pos - handle_height // 2, 4, handle_height))
+                self._draw_rect((200, 200, 200),
+                                (handle_x, y_pos - handle_height // 2, 4, handle_height))
             else:
                 # Add an empty placeholder for the "Back" option
                 self.slider_rects.append(None)
@@ -182,19 +325,10 @@ class GameView:
         screen_width = self.screen.get_width()
         screen_height = self.screen.get_height()
         
-        # Draw blurred background
-        self.screen.blit(self.blurred_background, (0, 0))
-        
-        # Add a semi-transparent overlay to make text more readable
-        overlay = pygame.Surface((screen_width, screen_height))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(160)  # Slightly more opaque for better contrast
-        self.screen.blit(overlay, (0, 0))
-        
         # Title
-        title = self.font.render("Select Save Slot", True, (255, 255, 255))
+        title = self.text.render("Select Save Slot", (255, 255, 255))
         title_rect = title.get_rect(center=(screen_width // 2, screen_height // 4))
-        self.screen.blit(title, title_rect)
+        self._blit(title, title_rect)
         
         # Reset save menu item rects
         self.save_menu_item_rects = []
@@ -213,9 +347,9 @@ class GameView:
                 color = (255, 255, 255)  # White for normal
             
             # Render slot with number
-            text = self.font.render(f"Slot {i+1}: {slot_name}", True, color)
+            text = self.text.render(f"Slot {i+1}: {slot_name}", color)
             rect = text.get_rect(center=(screen_width // 2, screen_height // 2 + i * 60))
-            self.screen.blit(text, rect)
+            self._blit(text, rect)
             
             # Store rectangle for mouse interaction
             self.save_menu_item_rects.append(rect)
@@ -229,53 +363,100 @@ class GameView:
         else:
             color = (255, 255, 255)  # White for normal
             
-        text = self.font.render("Back", True, color)
+        text = self.text.render("Back", color)
         rect = text.get_rect(center=(screen_width // 2, screen_height // 2 + 3 * 60))
-        self.screen.blit(text, rect)
+        self._blit(text, rect)
         
         # Store rectangle for mouse interaction
         self.save_menu_item_rects.append(rect)
     
-    def _render_game(self, model):
-        """Render the game state with the red ball on black background"""
-        # Fill screen with black background
-        self.screen.fill((0, 0, 0))
-        
-        # Draw the red ball
-        pygame.draw.circle(
-            self.screen, 
-            (255, 0, 0),  # Red color
-            (int(model.ball_x), int(model.ball_y)),  # Position
-            model.ball_radius  # Radius
-        )
+    def _render_game(self, model, alpha=1.0):
+        """Render the game state: the level around the red ball, and the instructions"""
+        self._render_world(model, alpha)
         
         # Draw instructions text
-        instructions = self.font.render("Use arrow keys to move", True, (255, 255, 255))
+        instructions = self.text.render("Use arrow keys to move", (255, 255, 255))
         instructions_rect = instructions.get_rect(center=(self.screen.get_width() // 2, 30))
-        self.screen.blit(instructions, instructions_rect)
+        self._blit(instructions, instructions_rect)
+        
+        # Draw floor number
+        if model.current_level:
+            floor_text = self.text.render(f"Floor {model.floor}", (255, 255, 255), size=24)
+            self._blit(floor_text, floor_text.get_rect(topleft=(10, 10)))
         
         # Draw ESC text
-        esc_text = pygame.font.Font(None, 24).render("Press ESC to return to menu", True, (200, 200, 200))
+        esc_text = self.text.render("Press ESC to return to menu", (200, 200, 200), size=24)
         esc_rect = esc_text.get_rect(bottomright=(self.screen.get_width() - 10, self.screen.get_height() - 10))
-        self.screen.blit(esc_text, esc_rect)
+        self._blit(esc_text, esc_rect)
+    
+    def _render_world(self, model, alpha=1.0):
+        """Queue the visible part of the level, the items and enemies on it and the ball"""
+        # Interpolate the ball between the last two simulation steps
+        ball_x = model.prev_ball_x + (model.ball_x - model.prev_ball_x) * alpha
+        ball_y = model.prev_ball_y + (model.ball_y - model.prev_ball_y) * alpha
+        
+        # Follow the ball (without a level the screen is the world, as before levels existed)
+        level = model.current_level
+        world_size = level.pixel_size if level else self.screen.get_size()
+        self.camera.follow(ball_x, ball_y, self.screen.get_size(), world_size)
+        
+        self._render_level(level)
+        for x, y, kind in self._visible(model.items, ITEM_SIZE):
+            self._render_item(kind, (x, y))
+        for x, y, kind in self._visible(model.enemies, ENEMY_RADIUS, alpha):
+            self._render_enemy(kind, (x, y))
+        self._render_player(self.camera.to_screen(ball_x, ball_y), model.ball_radius)
+    
+    def _visible(self, store, margin, alpha=None):
+        """
+        Screen x, y and kind of the entities of an EntityStore within margin
+        of the camera, culled with whole-column NumPy operations. With alpha,
+        positions are interpolated since the last simulation step.
+        """
+        if not store.count:
+            return ()
+        positions = store.positions
+        if alpha is not None and alpha != 1.0:
+            previous = store.prev_positions
+            positions = previous + (positions - previous) * np.float32(alpha)
+        x = positions[:, 0] - self.camera.x
+        y = positions[:, 1] - self.camera.y
+        visible = ((x > -margin) & (x < self.camera.width + margin) &
+                   (y > -margin) & (y < self.camera.height + margin))
+        return zip(x[visible].astype(np.int32).tolist(), y[visible].astype(np.int32).tolist(),
+                   store.kinds[visible].tolist())
     
     def _render_level(self, level):
-        # Render level layout
+        """Queue the cached chunks of the level that overlap the camera"""
+        self.tilemap.set_level(level)
         if level:
-            pass  # Add level rendering logic
+            for chunk_id, position, size in self.tilemap.visible_chunks(self.camera):
+                bounds = (position[0], position[1], size[0], size[1])
+                self.draw_ops.append(('chunk', chunk_id, position, bounds))
     
-    def _render_player(self, player):
-        # Render player sprite
-        if player:
-            pass  # Add player rendering logic
+    def _render_player(self, position, radius):
+        """Draw the player sprite, or the red ball, centered at a screen position"""
+        if self.player_sprite:
+            self._blit(self.player_sprite, self.player_sprite.get_rect(center=position))
+        else:
+            self._draw_circle((255, 0, 0), position, radius)
     
-    def _render_enemy(self, enemy):
-        # Render enemy sprite
-        pass  # Add enemy rendering logic
+    def _render_enemy(self, kind, position):
+        kind %= len(ENEMY_COLORS)
+        sprite = self.enemy_sprites[kind]
+        if sprite:
+            self._blit(sprite, sprite.get_rect(center=position))
+        else:
+            self._draw_circle(ENEMY_COLORS[kind], position, ENEMY_RADIUS)
     
-    def _render_item(self, item):
-        # Render item sprite
-        pass  # Add item rendering logic
+    def _render_item(self, kind, position):
+        kind %= len(ITEM_COLORS)
+        sprite = self.item_sprites[kind]
+        if sprite:
+            self._blit(sprite, sprite.get_rect(center=position))
+        else:
+            half = ITEM_SIZE // 2
+            self._draw_rect(ITEM_COLORS[kind], (position[0] - half, position[1] - half, ITEM_SIZE, ITEM_SIZE))
         
     def get_menu_item_at_position(self, pos):
         """Return the index of the menu item at the given position, or -1 if none"""
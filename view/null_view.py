@@ -0,0 +1,21 @@
+from view.game_view import GameView
+
+class NullView(GameView):
+    """
+    GameView that lays the screen out but draws nothing.
+
+    The menus still compute their item and slider rectangles, so mouse input
+    behaves exactly as with the real view, but no pixels are touched.
+    """
+
+    def render(self, model, alpha=1.0):
+        self.draw_ops = []
+        if model.game_state == "MENU":
+            self._render_menu(model)
+        elif model.game_state == "SETTINGS":
+            self._render_settings(model)
+        elif model.game_state == "SAVE_MENU":
+            self._render_save_menu(model)
+        elif model.game_state == "GAME":
+            self._render_game(model, alpha)
+        return []
@@ -0,0 +1,41 @@
+import json
+import os
+
+import pygame
+
+# Index written by sprite_processing/atlas_builder.py
+DEFAULT_INDEX = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'atlas', 'atlas.json')
+
+
+class SpriteAtlas:
+    """
+    Sprites packed into a few sheets by sprite_processing/atlas_builder.py.
+
+    Each sheet is loaded and converted once; every sprite is a subsurface of
+    its sheet, so it costs no extra memory and blits like any surface.
+    Without an index the atlas is simply empty and get() returns None.
+    """
+
+    def __init__(self, index_path=DEFAULT_INDEX):
+        self.sheets = []
+        self.sprites = {}
+        if index_path and os.path.exists(index_path):
+            self.load(index_path)
+
+    def load(self, index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        folder = os.path.dirname(index_path)
+        self.sheets = [pygame.image.load(os.path.join(folder, name)).convert_alpha()
+                       for name in index['sheets']]
+        self.sprites = {name: self.sheets[sheet].subsurface((x, y, width, height))
+                        for name, (sheet, x, y, width, height) in index['sprites'].items()}
+
+    def get(self, name):
+        return self.sprites.get(name)
+
+    def __contains__(self, name):
+        return name in self.sprites
+
+    def __len__(self):
+        return len(self.sprites)
@@ -0,0 +1,58 @@
+import pygame
+from collections import OrderedDict
+
+# Fonts loaded at startup: (font file or None for the default font, size)
+DEFAULT_FONTS = ((None, 48), (None, 24))
+
+# Rendered text surfaces kept before the least recently used ones are dropped
+DEFAULT_MAX_ENTRIES = 256
+
+
+class TextCache:
+    """
+    Shared font registry plus a cache of rendered text surfaces.
+
+    Fonts are loaded once and reused. Rendered text is kept by
+    (font, size, string, color, antialias) with least recently used eviction,
+    so text that does not change is only rasterized the first time it is drawn.
+    """
+
+    def __init__(self, fonts=DEFAULT_FONTS, max_entries=DEFAULT_MAX_ENTRIES):
+        pygame.font.init()
+        self.fonts = {}  # (font file, size) -> Font
+        for name, size in fonts:
+            self.get_font(size, name)
+
+        self.surfaces = OrderedDict()
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get_font(self, size, name=None):
+        """Return the font of a given size, loading it the first time"""
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, text, color, size=48, antialias=True, name=None):
+        """Return a surface with the text, rendering it only if it is not cached"""
+        key = (name, size, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.stats['hits'] += 1
+            return surface
+
+        self.stats['misses'] += 1
+        surface = self.get_font(size, name).render(text, antialias, color)
+        if pygame.display.get_surface():
+            surface = surface.convert_alpha()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+            self.stats['evictions'] += 1
+        return surface
+
+    def clear(self):
+        """Drop every rendered surface (fonts stay loaded)"""
+        self.surfaces.clear()
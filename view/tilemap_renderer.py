@@ -0,0 +1,103 @@
+import numpy as np
+import pygame
+
+from model.level_generator import FLOOR, STAIRS, TILE_SIZE, WALL
+
+# Chunks are squares of CHUNK_TILES x CHUNK_TILES tiles drawn into one surface
+CHUNK_TILES = 8
+
+# Color of each tile code
+TILE_COLORS = np.zeros((256, 3), dtype=np.uint8)
+TILE_COLORS[WALL] = (38, 34, 46)
+TILE_COLORS[FLOOR] = (110, 98, 82)
+TILE_COLORS[STAIRS] = (205, 170, 60)
+
+
+class TilemapRenderer:
+    """
+    Draws a Level as cached chunk surfaces.
+
+    A chunk is rendered the first time it is drawn and kept until one of its
+    tiles changes (Level.set_tile), so scrolling only blits the few chunks
+    overlapping the camera: the cost depends on the screen size, not on the
+    level size. Chunks are named by an id that changes whenever their
+    content does, so draw operations holding it can be diffed.
+    """
+
+    def __init__(self):
+        self.level = None
+        self.serial = 0  # Bumped for every new level, part of the chunk ids
+        self.chunks = {}  # (cx, cy) -> surface
+        self.generations = {}  # (cx, cy) -> times the chunk was invalidated
+        self.seen_changes = 0  # Entries of level.changes already handled
+        self._visible = (None, [])  # Last visible_chunks() query and result
+        self.stats = {'built': 0, 'invalidated': 0}
+
+    def set_level(self, level):
+        """Switch to a level, or pick up the tiles changed since the last call"""
+        if level is not self.level:
+            self.level = level
+            self.serial += 1
+            self.chunks.clear()
+            self.generations.clear()
+            self.seen_changes = len(level.changes) if level else 0
+            self._visible = (None, [])
+            return
+        if level and len(level.changes) > self.seen_changes:
+            for x, y in level.changes[self.seen_changes:]:
+                self.invalidate_tile(x, y)
+            self.seen_changes = len(level.changes)
+
+    def invalidate_tile(self, x, y):
+        """Drop the cached chunk holding tile (x, y), it is rebuilt the next time it is drawn"""
+        key = (x // CHUNK_TILES, y // CHUNK_TILES)
+        self.generations[key] = self.generations.get(key, 0) + 1
+        self._visible = (None, [])
+        if self.chunks.pop(key, None) is not None:
+            self.stats['invalidated'] += 1
+
+    def visible_chunks(self, camera):
+        """(chunk id, screen position, size) of every chunk overlapping the camera"""
+        query = (camera.x, camera.y, camera.width, camera.height)
+        if query == self._visible[0]:
+            return self._visible[1]
+
+        chunk_pixels = CHUNK_TILES * TILE_SIZE
+        width, height = self.level.pixel_size
+        x, y, view_width, view_height = query
+        cx0, cy0 = max(x // chunk_pixels, 0), max(y // chunk_pixels, 0)
+        cx1 = (min(x + view_width, width) - 1) // chunk_pixels
+        cy1 = (min(y + view_height, height) - 1) // chunk_pixels
+
+        visible = []
+        for cy in range(cy0, cy1 + 1):
+            top = cy * chunk_pixels
+            chunk_height = min(chunk_pixels, height - top)
+            for cx in range(cx0, cx1 + 1):
+                left = cx * chunk_pixels
+                chunk_id = (self.serial, cx, cy, self.generations.get((cx, cy), 0))
+                visible.append((chunk_id, (left - x, top - y), (min(chunk_pixels, width - left), chunk_height)))
+        self._visible = (query, visible)
+        return visible
+
+    def surface(self, chunk_id):
+        """Surface of a chunk from visible_chunks(), rendered if not cached"""
+        key = chunk_id[1:3]
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self._build(*key)
+            self.chunks[key] = surface
+        return surface
+
+    def _build(self, cx, cy):
+        x, y = cx * CHUNK_TILES, cy * CHUNK_TILES
+        tiles = self.level.tiles[y:y + CHUNK_TILES, x:x + CHUNK_TILES]
+
+        # One color per tile, scaled up to pixels, with darker joints between tiles
+        pixels = TILE_COLORS[tiles].repeat(TILE_SIZE, axis=0).repeat(TILE_SIZE, axis=1)
+        pixels[::TILE_SIZE] = pixels[::TILE_SIZE] // 4 * 3
+        pixels[:, ::TILE_SIZE] = pixels[:, ::TILE_SIZE] // 4 * 3
+
+        self.stats['built'] += 1
+        # surfarray indexes pixels as [x, y]
+        return pygame.surfarray.make_surface(pixels.swapaxes(0, 1)).convert()